@@ -0,0 +1,346 @@
+"""Источники активности пользователя для авто-паузы при простое"""
+import glob
+import os
+import platform
+import re
+import select
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from i18n import translator
+
+SAMPLE_INTERVAL = 5.0  # Период грубой выборки в секундах
+INPUT_IRQ_PATTERN = re.compile(r'i8042|keyboard|mouse|touchpad|hid', re.IGNORECASE)
+
+_log = translator('activity')
+
+class ActivitySource(ABC):
+    """Базовый класс для источников активности пользователя"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._last_activity = clock()
+
+    def mark_activity(self) -> None:
+        """Отмечает активность пользователя в текущий момент"""
+        self._last_activity = self._clock()
+
+    def idle_seconds(self) -> float:
+        """Возвращает время простоя пользователя в секундах"""
+        return max(0.0, self._clock() - self._last_activity)
+
+    def is_available(self) -> bool:
+        """Проверяет, способен ли источник обнаруживать простой"""
+        return True
+
+    def start(self) -> None:
+        """Запускает наблюдение (по умолчанию ничего не делает)"""
+
+    def stop(self) -> None:
+        """Останавливает наблюдение (по умолчанию ничего не делает)"""
+
+class NullActivitySource(ActivitySource):
+    """Источник-заглушка: пользователь всегда считается активным"""
+
+    def idle_seconds(self) -> float:
+        return 0.0
+
+    def is_available(self) -> bool:
+        return False
+
+class ManualActivitySource(ActivitySource):
+    """
+    Источник, управляемый вручную через mark_activity()
+
+    Используется для проверки логики простоя с подменой часов (clock).
+    """
+
+class _ThreadedActivitySource(ActivitySource):
+    """Источник с фоновым потоком-наблюдателем и учетом затрат CPU"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 sample_interval: float = SAMPLE_INTERVAL):
+        super().__init__(clock)
+        self.sample_interval = sample_interval
+        self.cpu_seconds = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self) -> None:
+        """Запускает поток-наблюдатель"""
+        if self._thread is not None:
+            return
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run_measured, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает поток и логирует затраченное им процессорное время"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sample_interval + 1)
+            self._thread = None
+            wall = max(time.monotonic() - self._started_at, 1e-9)
+            logging.debug(_log('activity_stopped', cpu=self.cpu_seconds, wall=wall,
+                               percent=self.cpu_seconds / wall * 100))
+
+    def _run_measured(self) -> None:
+        cpu_start = time.thread_time()
+        try:
+            self._watch()
+        except Exception as e:
+            logging.error(_log('activity_error', error=e))
+        finally:
+            self.cpu_seconds = time.thread_time() - cpu_start
+
+    @abstractmethod
+    def _watch(self) -> None:
+        """Цикл наблюдения; должен завершаться по self._stop_event"""
+
+class EpollActivitySource(_ThreadedActivitySource):
+    """
+    Событийный источник на epoll по файловым дескрипторам устройств ввода
+
+    После каждого события дескрипторы вычитываются, а поток засыпает на
+    sample_interval: при активном вводе просыпаемся не чаще раза за период.
+    Дескрипторы можно передать напрямую (например, конец pipe в роли
+    поддельного устройства).
+    """
+
+    def __init__(self, fds: List[int], clock: Callable[[], float] = time.monotonic,
+                 sample_interval: float = SAMPLE_INTERVAL, close_fds: bool = True):
+        super().__init__(clock, sample_interval)
+        self._fds = list(fds)
+        self._close_fds = close_fds
+
+    @classmethod
+    def from_paths(cls, paths: List[str], **kwargs) -> 'EpollActivitySource':
+        """Открывает доступные на чтение устройства из списка путей"""
+        fds = []
+        for path in paths:
+            try:
+                fds.append(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                continue
+        return cls(fds, **kwargs)
+
+    def is_available(self) -> bool:
+        return bool(self._fds) and hasattr(select, 'epoll')
+
+    def _watch(self) -> None:
+        poller = select.epoll()
+        try:
+            for fd in self._fds:
+                poller.register(fd, select.EPOLLIN)
+            while not self._stop_event.is_set():
+                events = poller.poll(self.sample_interval)
+                if not events:
+                    continue
+                got_data = False
+                for fd, mask in events:
+                    got_data = self._drain(fd) or got_data
+                    if mask & (select.EPOLLHUP | select.EPOLLERR):
+                        # Устройство отключено: иначе epoll будет будить нас постоянно,
+                        # а само отключение - не ввод пользователя
+                        poller.unregister(fd)
+                        self._drop(fd)
+                if not got_data:
+                    continue
+                self.mark_activity()
+                # Грубая выборка: не реагируем на поток событий чаще периода
+                self._stop_event.wait(self.sample_interval)
+                if any([self._drain(fd) for fd in self._fds]):
+                    self.mark_activity()
+        finally:
+            poller.close()
+            if self._close_fds:
+                for fd in self._fds:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+
+    def _drop(self, fd: int) -> None:
+        """Убирает отключенное устройство из списка вычитываемых"""
+        self._fds.remove(fd)
+        logging.debug(_log('activity_device_lost', fd=fd))
+        if self._close_fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _drain(fd: int) -> bool:
+        """Вычитывает накопленные события; возвращает True, если они были"""
+        got_data = False
+        try:
+            while os.read(fd, 4096):
+                got_data = True
+        except OSError:
+            pass
+        return got_data
+
+class InterruptsActivitySource(_ThreadedActivitySource):
+    """Источник на приращениях счетчиков прерываний устройств ввода в /proc/interrupts"""
+
+    def __init__(self, path: str = '/proc/interrupts', clock: Callable[[], float] = time.monotonic,
+                 sample_interval: float = SAMPLE_INTERVAL):
+        super().__init__(clock, sample_interval)
+        self._path = path
+        self._last_counts = self._read_counts()
+
+    def _read_counts(self) -> Dict[str, int]:
+        counts = {}
+        try:
+            with open(self._path, 'r') as f:
+                for line in f:
+                    if not INPUT_IRQ_PATTERN.search(line):
+                        continue
+                    irq, _, rest = line.partition(':')
+                    total = 0
+                    for token in rest.split():
+                        if not token.isdigit():
+                            break
+                        total += int(token)
+                    counts[irq.strip()] = total
+        except OSError:
+            pass
+        return counts
+
+    def is_available(self) -> bool:
+        return bool(self._last_counts)
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.sample_interval):
+            counts = self._read_counts()
+            if counts != self._last_counts:
+                self.mark_activity()
+            self._last_counts = counts
+
+class Win32ActivitySource(ActivitySource):
+    """Источник на GetLastInputInfo: время простоя запрашивается по требованию"""
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+
+        self._info = LASTINPUTINFO()
+        self._info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._byref = ctypes.byref
+
+    def idle_seconds(self) -> float:
+        if not self._user32.GetLastInputInfo(self._byref(self._info)):
+            return 0.0
+        millis = (self._kernel32.GetTickCount() - self._info.dwTime) & 0xFFFFFFFF
+        return millis / 1000.0
+
+def run_selftest(sample_interval: float = 0.1, burst_seconds: float = 1.0) -> bool:
+    """
+    Проверка источников активности без реальных устройств ввода
+
+    ManualActivitySource проверяется с подмененными часами,
+    EpollActivitySource - на двух pipe в роли устройств: простой без ввода,
+    сброс простоя при вводе, отключение устройства (EPOLLHUP) без сброса
+    простоя и поток ввода с частотой около 1 кГц, во время которого
+    измеряется процессорное время потока-наблюдателя.
+
+    Returns:
+        True, если все проверки прошли
+    """
+    checks = []
+    clock = [0.0]
+    manual = ManualActivitySource(clock=lambda: clock[0])
+    clock[0] += 30
+    idle_before = manual.idle_seconds()
+    manual.mark_activity()
+    checks.append(('manual', idle_before == 30 and manual.idle_seconds() == 0))
+
+    if not hasattr(select, 'epoll'):
+        print(_log('test_unsupported'))
+    else:
+        active_r, active_w = os.pipe()
+        lost_r, lost_w = os.pipe()
+        for fd in (active_r, lost_r):
+            os.set_blocking(fd, False)
+        source = EpollActivitySource([active_r, lost_r], sample_interval=sample_interval)
+        source.start()
+        started = time.monotonic()
+        try:
+            time.sleep(sample_interval * 3)
+            checks.append(('idle', source.idle_seconds() >= sample_interval * 2.5))
+
+            os.write(active_w, b'x')
+            time.sleep(sample_interval / 2)
+            checks.append(('input', source.idle_seconds() < sample_interval))
+
+            time.sleep(sample_interval * 3)
+            os.close(lost_w)
+            lost_w = None
+            time.sleep(sample_interval * 2)
+            checks.append(('hangup_not_input', source.idle_seconds() >= sample_interval * 4))
+            checks.append(('hangup_dropped', lost_r not in source._fds))
+
+            deadline = time.monotonic() + burst_seconds
+            while time.monotonic() < deadline:
+                os.write(active_w, b'x' * 24)  # размер struct input_event
+                time.sleep(0.001)
+            checks.append(('burst', source.idle_seconds() < sample_interval * 2))
+        finally:
+            wall = time.monotonic() - started
+            source.stop()
+            os.close(active_w)
+            if lost_w is not None:
+                os.close(lost_w)
+        print(_log('test_cpu', cpu=source.cpu_seconds * 1000, wall=wall,
+                   percent=source.cpu_seconds / wall * 100, interval=sample_interval))
+
+    for name, ok in checks:
+        print(_log('test_check_ok' if ok else 'test_check_failed', check=name))
+    passed = all(ok for _, ok in checks)
+    print(_log('test_passed' if passed else 'test_failed'))
+    return passed
+
+def init_activity_source() -> ActivitySource:
+    """
+    Инициализирует источник активности для текущей платформы
+
+    Returns:
+        Экземпляр ActivitySource (NullActivitySource, если простой не определить)
+    """
+    system = platform.system()
+    logging.debug(_log('activity_init', system=system))
+
+    source: Optional[ActivitySource] = None
+    if system == "Linux":
+        source = EpollActivitySource.from_paths(sorted(glob.glob('/dev/input/event*')))
+        if source.is_available():
+            logging.info(_log('activity_evdev', count=len(source._fds)))
+        else:
+            source = InterruptsActivitySource()
+            if source.is_available():
+                logging.info(_log('activity_interrupts', count=len(source._last_counts)))
+                # Эвристика: USB-клавиатуры и мыши делят прерывание контроллера (xhci_hcd) и не видны
+                logging.warning(_log('activity_interrupts_partial'))
+            else:
+                source = None
+    elif system == "Windows":
+        try:
+            source = Win32ActivitySource()
+            logging.info(_log('activity_win32'))
+        except Exception:
+            source = None
+
+    if source is None:
+        logging.info(_log('activity_unavailable'))
+        return NullActivitySource()
+    return source
@@ -0,0 +1,526 @@
+"""Подавление напоминаний во время встреч по локальному календарю (.ics)"""
+import bisect
+import calendar
+import datetime
+import os
+import re
+import tempfile
+import time
+import logging
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    from zoneinfo import ZoneInfo  # Python 3.9+
+except ImportError:  # pragma: no cover - старые версии Python
+    ZoneInfo = None
+
+from i18n import translator
+
+WINDOW_PAST_DAYS = 1  # Окно разворачивания повторений: назад от текущего момента
+WINDOW_FUTURE_DAYS = 14  # и вперед
+RECHECK_SECONDS = 60  # Как часто проверять mtime/размер файла
+
+_DURATION_RE = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+_WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+_RRULE_COMMON = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'WKST'}
+# Части RRULE, которые умеет разворачивать _occurrences; правила с другими частями пропускаются,
+# чтобы не откладывать напоминания в дни без встречи
+_RRULE_PARTS = {
+    'DAILY': {'BYDAY'},
+    'WEEKLY': {'BYDAY'},
+    'MONTHLY': {'BYDAY', 'BYMONTHDAY', 'BYSETPOS', 'BYMONTH'},
+    'YEARLY': {'BYDAY', 'BYMONTHDAY', 'BYSETPOS', 'BYMONTH'},
+}
+
+_log = translator('calendar_ics')
+
+def _unfolded_lines(f) -> Iterator[str]:
+    """Построчно разворачивает свернутые строки iCalendar (RFC 5545, 3.1)"""
+    current = None
+    for raw in f:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition('=')
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+class _Time:
+    """Момент из календаря: наивное время + часовой пояс (для корректного DST при повторениях)"""
+
+    __slots__ = ('dt', 'tz', 'all_day')
+
+    def __init__(self, dt: datetime.datetime, tz, all_day: bool):
+        self.dt = dt
+        self.tz = tz
+        self.all_day = all_day
+
+    def epoch(self, dt: Optional[datetime.datetime] = None) -> float:
+        dt = self.dt if dt is None else dt
+        if self.tz is not None:
+            return dt.replace(tzinfo=self.tz).timestamp()
+        return time.mktime(dt.timetuple())
+
+def _zone(tzid: Optional[str]):
+    if not tzid or ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(tzid)
+    except Exception:
+        # Например, Windows-имена поясов из Outlook: считаем время локальным
+        return None
+
+def _parse_time(value: str, params: Dict[str, str]) -> _Time:
+    value = value.strip()
+    # Разбор срезами заметно быстрее strptime на календарях в десятки тысяч событий
+    date = datetime.datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return _Time(date, None, True)
+    if len(value) < 15 or value[8] != 'T':
+        raise ValueError(f'invalid date-time: {value}')
+    dt = date.replace(hour=int(value[9:11]), minute=int(value[11:13]), second=int(value[13:15]))
+    if value.endswith('Z'):
+        return _Time(dt, datetime.timezone.utc, False)
+    return _Time(dt, _zone(params.get('TZID')), False)
+
+def _parse_duration(value: str) -> Optional[datetime.timedelta]:
+    m = _DURATION_RE.match(value.strip())
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = datetime.timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                               minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == '-' else delta
+
+def _parse_byday(value: str) -> List[Tuple[Optional[int], int]]:
+    """Разбирает BYDAY: "2TU" -> (2, 1), "-1FR" -> (-1, 4), "MO" -> (None, 0)"""
+    result = []
+    for part in value.split(','):
+        part = part.strip().upper()
+        if part[-2:] not in _WEEKDAYS:
+            raise ValueError(f'invalid BYDAY: {part}')
+        result.append((int(part[:-2]) if part[:-2] else None, _WEEKDAYS[part[-2:]]))
+    return result
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+def _rrule_supported(rrule: Dict[str, str]) -> bool:
+    """Проверяет, что все части RRULE разворачиваются _occurrences без искажений"""
+    freq = rrule.get('FREQ')
+    if freq not in _RRULE_PARTS or set(rrule) - _RRULE_COMMON - _RRULE_PARTS[freq]:
+        return False
+    if freq == 'WEEKLY' and rrule.get('WKST', 'MO') != 'MO' and rrule.get('INTERVAL', '1') != '1':
+        # Недели считаются с понедельника: при INTERVAL > 1 другой WKST сдвигает дни
+        return False
+    if freq in ('DAILY', 'WEEKLY') and any(n is not None for n, _ in _parse_byday(rrule.get('BYDAY', 'MO'))):
+        return False
+    if freq == 'YEARLY' and ('BYDAY' in rrule or 'BYMONTHDAY' in rrule) and 'BYMONTH' not in rrule:
+        # BYDAY/BYMONTHDAY по всему году (например, 20MO - 20-й понедельник года) не разворачиваем
+        return False
+    return True
+
+def _month_days(year: int, month: int, byday: List[Tuple[Optional[int], int]], bymonthday: List[int],
+                default_day: int) -> List[int]:
+    """Дни месяца, подходящие под BYDAY/BYMONTHDAY (без них - день DTSTART)"""
+    first_weekday, length = calendar.monthrange(year, month)
+    days = None
+    if bymonthday:
+        days = {d if d > 0 else length + d + 1 for d in bymonthday}
+        days = {d for d in days if 1 <= d <= length}
+    if byday:
+        matched = set()
+        for n, weekday in byday:
+            same_weekday = list(range(1 + (weekday - first_weekday) % 7, length + 1, 7))
+            if n is None:
+                matched.update(same_weekday)
+            elif 1 <= abs(n) <= len(same_weekday):
+                matched.add(same_weekday[n - 1 if n > 0 else n])
+        days = matched if days is None else days & matched
+    if days is None:
+        days = {default_day} if default_day <= length else set()
+    return sorted(days)
+
+def _until(value: str, tz) -> datetime.datetime:
+    """UNTIL в наивном времени события (tz - пояс DTSTART, None - локальное время)"""
+    until = _parse_time(value, {})
+    if until.all_day:
+        return until.dt + datetime.timedelta(days=1)
+    if until.tz is None:
+        return until.dt
+    # UNTIL в UTC ("...Z"), а повторения - в наивном времени пояса события
+    moment = until.dt.replace(tzinfo=until.tz)
+    if tz is not None:
+        return moment.astimezone(tz).replace(tzinfo=None)
+    return datetime.datetime.fromtimestamp(moment.timestamp())
+
+def _occurrences(start: datetime.datetime, rrule: Dict[str, str], window_start: datetime.datetime,
+                 window_end: datetime.datetime, tz=None) -> Iterator[datetime.datetime]:
+    """
+    Разворачивает RRULE в окне
+
+    Поддерживаются FREQ, INTERVAL, COUNT, UNTIL, BYDAY (для MONTHLY/YEARLY - с
+    порядковым номером), BYMONTHDAY, BYMONTH и BYSETPOS в пределах
+    _RRULE_PARTS; правила проверяются заранее _rrule_supported.
+    """
+    freq = rrule.get('FREQ')
+    interval = max(1, int(rrule.get('INTERVAL', '1') or 1))
+    count = int(rrule['COUNT']) if 'COUNT' in rrule else None
+    until = _until(rrule['UNTIL'], tz) if 'UNTIL' in rrule else None
+    byday_rule = _parse_byday(rrule['BYDAY']) if rrule.get('BYDAY') else []
+    byday = [weekday for _, weekday in byday_rule]
+
+    if freq == 'DAILY' or (freq == 'WEEKLY' and not byday):
+        step = datetime.timedelta(days=interval * (7 if freq == 'WEEKLY' else 1))
+        first = start
+        if count is None and start < window_start:
+            # Без COUNT можно сразу перескочить к окну, не перебирая годы истории
+            first = start + step * ((window_start - start) // step)
+        candidates = (first + step * i for i in range(10 ** 6))
+        if byday:
+            # DAILY с BYDAY (например, по будням) - фильтр по дню недели
+            candidates = (c for c in candidates if c.weekday() in byday)
+    elif freq == 'WEEKLY':
+        week0 = start - datetime.timedelta(days=start.weekday())
+        skip = 0
+        if count is None and start < window_start:
+            skip = (window_start - week0).days // (7 * interval)
+        def weekly():
+            k = skip
+            while True:
+                week = week0 + datetime.timedelta(weeks=k * interval)
+                for wd in sorted(byday):
+                    candidate = week + datetime.timedelta(days=wd)
+                    if candidate >= start:
+                        yield candidate
+                k += 1
+        candidates = weekly()
+    elif freq in ('MONTHLY', 'YEARLY'):
+        step = interval * (12 if freq == 'YEARLY' else 1)
+        bymonth = _parse_ints(rrule.get('BYMONTH', ''))
+        bymonthday = _parse_ints(rrule.get('BYMONTHDAY', ''))
+        setpos = _parse_ints(rrule.get('BYSETPOS', ''))
+        skip = 0
+        if count is None and start < window_start:
+            behind = (window_start.year - start.year) * 12 + window_start.month - start.month - 1
+            skip = max(0, behind // step)
+        def periodic():
+            k = skip
+            while True:
+                base = start.year * 12 + start.month - 1 + k * step
+                year = base // 12
+                if year > datetime.MAXYEAR or datetime.datetime(year, base % 12 + 1, 1) > window_end:
+                    return
+                if freq == 'YEARLY':
+                    months = sorted(bymonth) if bymonth else [start.month]
+                else:
+                    months = [base % 12 + 1] if not bymonth or base % 12 + 1 in bymonth else []
+                period = [start.replace(year=year, month=month, day=day)
+                          for month in months
+                          for day in _month_days(year, month, byday_rule, bymonthday, start.day)]
+                if setpos:
+                    # BYSETPOS выбирает из всех дат периода по номеру (отрицательный - с конца)
+                    period = sorted({period[p - 1 if p > 0 else p] for p in setpos if 1 <= abs(p) <= len(period)})
+                for candidate in period:
+                    if candidate >= start:
+                        yield candidate
+                k += 1
+        candidates = periodic()
+    else:
+        yield start
+        return
+
+    emitted = 0
+    for occurrence in candidates:
+        if until is not None and occurrence > until:
+            return
+        if count is not None and emitted >= count:
+            return
+        emitted += 1
+        if occurrence > window_end:
+            return
+        yield occurrence
+
+class CalendarIndex:
+    """
+    Индекс интервалов занятости из .ics файла
+
+    Файл читается потоково и переиндексируется только при смене mtime/размера
+    или когда скользящее окно повторений подходит к концу. Пересекающиеся
+    интервалы сливаются в отсортированные массивы начал и концов, поэтому
+    "занят ли пользователь сейчас и до какого момента" - это один bisect, O(log n).
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._signature = None
+        self._window_end = 0.0
+        self._next_check = 0.0
+        self.events = 0
+
+    def busy_until(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Проверяет, занят ли пользователь в момент now
+
+        Returns:
+            Время окончания текущего блока занятости (unix time) или None
+        """
+        now = self._clock() if now is None else now
+        self._refresh(now)
+        i = bisect.bisect_right(self._starts, now) - 1
+        if i >= 0 and self._ends[i] > now:
+            return self._ends[i]
+        return None
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _refresh(self, now: float) -> None:
+        if now < self._next_check:
+            return
+        self._next_check = now + RECHECK_SECONDS
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._signature is not None:
+                logging.warning(_log('calendar_error', path=self.path, error=e))
+            self._signature = None
+            self._starts, self._ends = [], []
+            return
+        signature = (st.st_mtime_ns, st.st_size)
+        # Переиндексация - только при изменении файла или когда окно уходит в прошлое
+        if signature == self._signature and now + WINDOW_FUTURE_DAYS * 86400 / 2 < self._window_end:
+            return
+        self.reindex(now)
+        self._signature = signature
+
+    def reindex(self, now: Optional[float] = None) -> None:
+        """Перечитывает файл и перестраивает индекс для окна вокруг now"""
+        now = self._clock() if now is None else now
+        started = time.perf_counter()
+        window_start = now - WINDOW_PAST_DAYS * 86400
+        window_end = now + WINDOW_FUTURE_DAYS * 86400
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                intervals, events, unsupported = self._collect(f, window_start, window_end)
+        except OSError as e:
+            logging.warning(_log('calendar_error', path=self.path, error=e))
+            return
+
+        intervals.sort()
+        starts, ends = [], []
+        for start, end in intervals:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts, self._ends = starts, ends
+        self._window_end = window_end
+        self.events = events
+        if unsupported:
+            logging.warning(_log('calendar_rrule_unsupported', path=self.path, count=len(unsupported),
+                                 rule=unsupported[0]))
+        logging.debug(_log('calendar_indexed', path=self.path, events=events, intervals=len(starts),
+                           elapsed=(time.perf_counter() - started) * 1000))
+
+    @staticmethod
+    def _collect(f, window_start: float, window_end: float) -> Tuple[List[Tuple[float, float]], int, List[str]]:
+        intervals: List[Tuple[float, float]] = []
+        unsupported: List[str] = []
+        overridden: Set[Tuple[str, float]] = set()
+        recurring = []
+        events = 0
+        event = None
+        for line in _unfolded_lines(f):
+            if line == 'BEGIN:VEVENT':
+                event = {'EXDATE': []}
+                continue
+            if event is None:
+                continue
+            if line == 'END:VEVENT':
+                events += 1
+                CalendarIndex._add_event(event, window_start, window_end, intervals, overridden, recurring,
+                                         unsupported)
+                event = None
+                continue
+            name, params, value = _split_property(line)
+            if name == 'EXDATE':
+                event['EXDATE'].extend((v, params) for v in value.split(','))
+            elif name in ('DTSTART', 'DTEND', 'DURATION', 'RRULE', 'TRANSP', 'STATUS', 'UID', 'RECURRENCE-ID'):
+                event[name] = (value, params)
+
+        # Повторения разворачиваются после чтения файла, чтобы учесть измененные экземпляры
+        for uid, occurrences in recurring:
+            for start, end in occurrences:
+                if (uid, start) not in overridden:
+                    intervals.append((start, end))
+        return intervals, events, unsupported
+
+    @staticmethod
+    def _add_event(event, window_start, window_end, intervals, overridden, recurring, unsupported) -> None:
+        uid = event.get('UID', ('',))[0]
+        if 'RECURRENCE-ID' in event:
+            # Замена экземпляра снимает его из серии, даже если сама она отменена или свободна
+            try:
+                overridden.add((uid, _parse_time(*event['RECURRENCE-ID']).epoch()))
+            except ValueError:
+                pass
+        if 'DTSTART' not in event:
+            return
+        if event.get('TRANSP', ('',))[0].upper() == 'TRANSPARENT':
+            return
+        if event.get('STATUS', ('',))[0].upper() == 'CANCELLED':
+            return
+        try:
+            start = _parse_time(*event['DTSTART'])
+        except ValueError:
+            return
+        if start.all_day:
+            # События на весь день (праздники, дни рождения) не считаем встречами
+            return
+
+        if 'DTEND' in event:
+            try:
+                duration = _parse_time(*event['DTEND']).dt - start.dt
+            except ValueError:
+                return
+        else:
+            duration = _parse_duration(event.get('DURATION', ('PT0S',))[0]) or datetime.timedelta(0)
+        if duration <= datetime.timedelta(0):
+            return
+
+        if 'RRULE' not in event:
+            begin = start.epoch()
+            end = begin + duration.total_seconds()
+            if end > window_start and begin < window_end:
+                intervals.append((begin, end))
+            return
+
+        rrule = {key.upper(): value.upper()
+                 for key, value in (part.partition('=')[::2] for part in event['RRULE'][0].split(';') if part)}
+        try:
+            supported = _rrule_supported(rrule)
+        except ValueError:
+            supported = False
+        if not supported:
+            unsupported.append(event['RRULE'][0])
+            return
+        excluded = set()
+        for value, params in event['EXDATE']:
+            try:
+                excluded.add(_parse_time(value, dict(event['DTSTART'][1], **params)).epoch())
+            except ValueError:
+                pass
+        # Окно в наивном времени события (с запасом на сдвиг часового пояса)
+        naive_start = datetime.datetime.fromtimestamp(window_start) - duration - datetime.timedelta(days=1)
+        naive_end = datetime.datetime.fromtimestamp(window_end) + datetime.timedelta(days=1)
+        occurrences = []
+        try:
+            expanded = list(_occurrences(start.dt, rrule, naive_start, naive_end, start.tz))
+        except ValueError:
+            unsupported.append(event['RRULE'][0])
+            return
+        for occurrence in expanded:
+            begin = start.epoch(occurrence)
+            if begin in excluded:
+                continue
+            end = begin + duration.total_seconds()
+            if end > window_start and begin < window_end:
+                occurrences.append((begin, end))
+        recurring.append((uid, occurrences))
+
+def check_overrides(now: Optional[float] = None) -> bool:
+    """
+    Проверяет замены экземпляров ежедневной серии: отмененный (STATUS:CANCELLED)
+    и перенесенный в свободное время (TRANSP:TRANSPARENT) экземпляры не должны
+    считаться занятостью, остальные дни серии - должны
+
+    Returns:
+        True, если проверка прошла
+    """
+    now = time.time() if now is None else now
+    first = (datetime.datetime.fromtimestamp(now) + datetime.timedelta(days=1)).replace(
+        hour=10, minute=0, second=0, microsecond=0)
+    days = [first + datetime.timedelta(days=i) for i in range(3)]
+    fmt = '%Y%m%dT%H%M%S'
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0',
+             'BEGIN:VEVENT', 'UID:series', f'DTSTART:{days[0]:{fmt}}',
+             f'DTEND:{days[0] + datetime.timedelta(minutes=30):{fmt}}', 'RRULE:FREQ=DAILY', 'END:VEVENT']
+    for day, prop in ((days[1], 'STATUS:CANCELLED'), (days[2], 'TRANSP:TRANSPARENT')):
+        lines += ['BEGIN:VEVENT', 'UID:series', f'RECURRENCE-ID:{day:{fmt}}', f'DTSTART:{day:{fmt}}',
+                  f'DTEND:{day + datetime.timedelta(minutes=30):{fmt}}', prop, 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    fd, path = tempfile.mkstemp(suffix='.ics')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\r\n'.join(lines) + '\r\n')
+        index = CalendarIndex(path)
+        index.reindex(now)
+        busy = [index.busy_until(time.mktime((day + datetime.timedelta(minutes=15)).timetuple())) is not None
+                for day in days]
+    finally:
+        os.unlink(path)
+    ok = busy == [True, False, False]
+    print(_log('bench_overrides_ok' if ok else 'bench_overrides_failed'))
+    return ok
+
+def run_benchmark(events: int = 20000, lookups: int = 100000) -> Dict[str, float]:
+    """
+    Бенчмарк индекса на синтетическом календаре
+
+    Генерирует events событий (десятая часть - еженедельные повторения),
+    измеряет время индексации и средней проверки "занят ли сейчас".
+    """
+    now = time.time()
+    base = datetime.datetime.fromtimestamp(now) - datetime.timedelta(days=365)
+    fd, path = tempfile.mkstemp(suffix='.ics')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n')
+            for i in range(events):
+                start = base + datetime.timedelta(hours=i * 0.5)
+                end = start + datetime.timedelta(minutes=25)
+                f.write('BEGIN:VEVENT\r\n')
+                f.write(f'UID:bench-{i}\r\n')
+                f.write(f'DTSTART:{start:%Y%m%dT%H%M%S}\r\n')
+                f.write(f'DTEND:{end:%Y%m%dT%H%M%S}\r\n')
+                if i % 10 == 0:
+                    f.write('RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR\r\n')
+                f.write('END:VEVENT\r\n')
+            f.write('END:VCALENDAR\r\n')
+
+        index = CalendarIndex(path)
+        started = time.perf_counter()
+        index.reindex(now)
+        parse_ms = (time.perf_counter() - started) * 1000
+
+        index._next_check = float('inf')  # Измеряем только поиск, без проверки файла
+        window = WINDOW_FUTURE_DAYS * 86400
+        started = time.perf_counter()
+        for i in range(lookups):
+            index.busy_until(now + (i * 7919) % window)
+        per_call = (time.perf_counter() - started) / lookups * 1e6
+    finally:
+        os.unlink(path)
+
+    print(_log('bench_parse', events=events, elapsed=parse_ms, intervals=len(index)))
+    print(_log('bench_lookup', per_call=per_call, calls=lookups))
+    overrides_ok = check_overrides(now)
+    return {'parse_ms': parse_ms, 'lookup_us': per_call, 'intervals': len(index),
+            'overrides_ok': 1.0 if overrides_ok else 0.0}
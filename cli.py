@@ -11,5 +11,32 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='EyeCare Reminder - напоминания для здоровья глаз')
     parser.add_argument('--lang', type=str, help='Язык интерфейса (ru, en, auto)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Подробное логирование (DEBUG уровень)')
+    parser.add_argument('--stats', type=int, nargs='?', const=30, metavar='DAYS',
+                        help='Показать статистику перерывов за DAYS дней (по умолчанию 30) и выйти')
+    parser.add_argument('--lean', action='store_true',
+                        help='Экономный режим: иконка без ImageDraw, строки самопроверок освобождаются после запуска трея')
+    parser.add_argument('--lean-bench', action='store_true',
+                        help='Сравнить память обычного и экономного режимов в отдельных процессах и выйти')
+    parser.add_argument('--memory-report', type=float, default=0, metavar='MINUTES',
+                        help='Логировать RSS и число объектов gc каждые MINUTES минут')
+    parser.add_argument('--calendar-bench', type=int, metavar='EVENTS',
+                        help='Бенчмарк индекса календаря на EVENTS синтетических событиях и выход')
+    parser.add_argument('--sync-test', type=int, metavar='NODES',
+                        help='Проверка синхронизации NODES узлов на loopback и выход')
+    parser.add_argument('--activity-test', action='store_true',
+                        help='Проверка источников активности на pipe вместо устройств ввода и выход')
+    parser.add_argument('--sd-notify-test', action='store_true',
+                        help='Проверка протокола sd_notify на локальном сокете и выход')
+    # Параметры демона (daemon.py)
+    parser.add_argument('--users-glob', type=str, default='/home/*/.config/eyecare/config.ini',
+                        help='Демон: glob-шаблон пользовательских config.ini')
+    parser.add_argument('--workers', type=int, default=4, help='Демон: число рабочих потоков доставки')
+    parser.add_argument('--scale-test', type=int, metavar='USERS',
+                        help='Демон: нагрузочный тест с USERS имитируемыми пользователями')
+    # Параметры прогона на утечки (soak.py)
+    parser.add_argument('--soak-ticks', type=int, default=300000, metavar='TICKS',
+                        help='Прогон: число секундных тиков (время ускорено)')
+    parser.add_argument('--soak-notifier', choices=('stub', 'platform'), default='stub',
+                        help='Прогон: stub - только подсчет уведомлений, platform - настоящий notifier')
     return parser.parse_args()
 
@@ -4,47 +4,31 @@ import locale
 import configparser
 import logging
 
+from i18n import translator, available_languages
+from templates import Template, TemplateError
+from work_schedule import compile_schedule, ScheduleError
+from peer_sync import DEFAULT_PORT, parse_address
+
 # Константы
 DEFAULT_INTERVAL = 20  # Интервал по умолчанию в минутах
 MAX_INTERVAL = 1440  # Максимальный интервал (24 часа)
 MIN_INTERVAL = 1  # Минимальный интервал в минутах
-SUPPORTED_LANGUAGES = ['auto', 'ru', 'en']
+SUPPORTED_LANGUAGES = ['auto'] + available_languages()  # Языки - файлы каталога locales/*.ini
 VALID_MESSAGE_MODES = ['random', 'sequential', 'single']
+DEFAULT_IDLE_PAUSE_MINUTES = 0  # Простой, после которого таймер встает на авто-паузу (0 - выключено, включается явно)
+DEFAULT_IDLE_RESET_MINUTES = 5  # Отсутствие, после которого цикл начинается заново
+DEFAULT_HISTORY_FILE = 'eyecare_history.db'  # Журнал событий (пустое значение отключает)
+DEFAULT_STATE_FILE = 'eyecare_state.bin'  # Состояние таймера между перезапусками (пустое значение отключает)
+DEFAULT_OUTBOX_FILE = 'eyecare_outbox.json'  # Очередь недоставленных уведомлений (пустое значение - только в памяти)
+DEFAULT_CALENDAR_FILE = ''  # Локальный .ics для откладывания напоминаний во время встреч (пусто - выключено)
+
+_log = translator('config')
 
-# Словари локализации для логирования
-LOG_MESSAGES = {
-    'ru': {
-        'config_created': 'Создание нового конфигурационного файла: {filename}',
-        'config_loaded_debug': 'Загружена конфигурация: интервал={interval} мин, режим={mode}, язык={lang}, сообщений={count}',
-        'interval_invalid': 'Некорректное значение interval_minutes: {interval}. Используется значение по умолчанию: {default}',
-        'interval_too_large': 'Слишком большой интервал: {interval} мин. Ограничение: {max_value} мин',
-        'interval_read_error': 'Ошибка чтения interval_minutes: {error}. Используется значение по умолчанию: {default}',
-        'mode_unknown': 'Неизвестное значение message_mode: "{mode}". Допустимые режимы: {valid}. Используется режим "sequential"',
-        'lang_unknown': 'Неизвестное значение lang: "{lang}". Допустимые значения: {valid}. Используется "{fallback}"',
-        'save_interval_error': 'Ошибка сохранения интервала в конфиг: {error}',
-    },
-    'en': {
-        'config_created': 'Creating new configuration file: {filename}',
-        'config_loaded_debug': 'Configuration loaded: interval={interval} min, mode={mode}, language={lang}, messages={count}',
-        'interval_invalid': 'Invalid interval_minutes value: {interval}. Using default: {default}',
-        'interval_too_large': 'Interval too large: {interval} minutes. Capping at {max_value} minutes',
-        'interval_read_error': 'Error reading interval_minutes: {error}. Using default: {default}',
-        'mode_unknown': 'Unknown message_mode "{mode}". Valid modes: {valid}. Using "sequential"',
-        'lang_unknown': 'Unknown lang "{lang}". Valid values: {valid}. Using "{fallback}"',
-        'save_interval_error': 'Error saving interval to config: {error}',
-    }
-}
-
-_log_lang = 'en'
-
-def set_log_language(lang: str):
-    """Устанавливает язык для логирования"""
-    global _log_lang
-    _log_lang = lang if lang in LOG_MESSAGES else 'en'
-
-def _log(key: str, **kwargs) -> str:
-    """Возвращает локализованное сообщение для логирования"""
-    return LOG_MESSAGES[_log_lang].get(key, LOG_MESSAGES['en'].get(key, key)).format(**kwargs)
+def _system_language():
+    """Определяет язык по системной локали (если для него есть каталог)"""
+    sys_lang = locale.getdefaultlocale()[0]
+    code = sys_lang[:2].lower() if sys_lang else ''
+    return code if code in SUPPORTED_LANGUAGES[1:] else 'en'
 
 def get_language(lang_override=None, filename='config.ini'):
     """
@@ -55,7 +39,7 @@ def get_language(lang_override=None, filename='config.ini'):
         filename: Путь к файлу конфигурации
         
     Returns:
-        Код языка ('ru' или 'en')
+        Код языка (например, 'ru' или 'en')
     """
     if lang_override:
         return lang_override
@@ -68,8 +52,7 @@ def get_language(lang_override=None, filename='config.ini'):
             return lang_setting
     
     # Автоопределение по системной локали
-    sys_lang = locale.getdefaultlocale()[0]
-    return 'ru' if sys_lang and sys_lang.startswith('ru') else 'en'
+    return _system_language()
 
 def load_config(filename='config.ini', lang_override=None):
     """
@@ -82,10 +65,6 @@ def load_config(filename='config.ini', lang_override=None):
     Returns:
         Кортеж (interval, messages, mode, lang)
     """
-    # Устанавливаем язык для логирования в этом модуле (на основе конфига/системы)
-    resolved_lang_for_logs = get_language(lang_override=lang_override, filename=filename)
-    set_log_language(resolved_lang_for_logs)
-    
     # Автосоздание базового конфига с секциями сообщений
     if not os.path.exists(filename):
         logging.info(_log('config_created', filename=filename))
@@ -93,7 +72,13 @@ def load_config(filename='config.ini', lang_override=None):
             f.write('[Settings]\n')
             f.write(f'interval_minutes = {DEFAULT_INTERVAL}\n')
             f.write(f'message_mode = {VALID_MESSAGE_MODES[0]}\n')
-            f.write(f'lang = {SUPPORTED_LANGUAGES[0]}\n\n')
+            f.write(f'lang = {SUPPORTED_LANGUAGES[0]}\n')
+            f.write(f'idle_pause_minutes = {DEFAULT_IDLE_PAUSE_MINUTES}\n')
+            f.write(f'idle_reset_minutes = {DEFAULT_IDLE_RESET_MINUTES}\n')
+            f.write(f'history_file = {DEFAULT_HISTORY_FILE}\n')
+            f.write(f'state_file = {DEFAULT_STATE_FILE}\n')
+            f.write(f'outbox_file = {DEFAULT_OUTBOX_FILE}\n')
+            f.write(f'calendar_file = {DEFAULT_CALENDAR_FILE}\n\n')
             f.write('[Messages.ru]\n')
             f.write('default = Встань, моргни и глянь вдаль. Глаза скажут спасибо.\n')
             f.write('messages =\n')
@@ -142,8 +127,7 @@ def load_config(filename='config.ini', lang_override=None):
     # Выбор языка: аргумент > конфиг > язык системы
     lang = lang_override or lang_setting
     if lang == SUPPORTED_LANGUAGES[0]:  # 'auto'
-        sys_lang = locale.getdefaultlocale()[0]
-        lang = 'ru' if sys_lang and sys_lang.startswith('ru') else 'en'
+        lang = _system_language()
 
     messages_section = f'Messages.{lang}'
     if not config.has_section(messages_section):
@@ -162,6 +146,15 @@ def load_config(filename='config.ini', lang_override=None):
     else:
         messages.insert(0, default_msg)
 
+    # Шаблоны компилируются один раз здесь, а не при каждом уведомлении
+    templates = []
+    for text in messages:
+        try:
+            templates.append(Template(text))
+        except TemplateError as e:
+            logging.error(_log('template_invalid', error=e))
+    messages = templates or [Template('Take a break!')]
+
     logging.debug(_log('config_loaded_debug', interval=interval, mode=mode, lang=lang, count=len(messages)))
     return interval, messages, mode, lang
 
@@ -184,3 +177,138 @@ def save_interval(interval_minutes: int, filename='config.ini'):
     except Exception as e:
         logging.error(_log('save_interval_error', error=e))
 
+def load_idle_settings(filename='config.ini'):
+    """
+    Загружает настройки авто-паузы при простое
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Кортеж (idle_pause_minutes, idle_reset_minutes); 0 в первом значении отключает авто-паузу
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+
+    values = []
+    for key, default in (('idle_pause_minutes', DEFAULT_IDLE_PAUSE_MINUTES),
+                         ('idle_reset_minutes', DEFAULT_IDLE_RESET_MINUTES)):
+        try:
+            value = config.getint('Settings', key, fallback=default)
+            if value < 0 or value > MAX_INTERVAL:
+                raise ValueError(value)
+        except (ValueError, TypeError) as e:
+            logging.warning(_log('idle_read_error', key=key, error=e, default=default))
+            value = default
+        values.append(value)
+    return tuple(values)
+
+def load_history_file(filename='config.ini'):
+    """
+    Возвращает путь к журналу событий
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Путь к базе SQLite или None, если журнал отключен
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    path = config.get('Settings', 'history_file', fallback=DEFAULT_HISTORY_FILE).strip()
+    return path or None
+
+def load_state_file(filename='config.ini'):
+    """
+    Возвращает путь к файлу состояния таймера
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Путь к файлу состояния или None, если сохранение отключено
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    path = config.get('Settings', 'state_file', fallback=DEFAULT_STATE_FILE).strip()
+    return path or None
+
+def load_outbox_file(filename='config.ini'):
+    """
+    Возвращает путь к файлу очереди недоставленных уведомлений
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Путь к файлу очереди или None, если очередь хранится только в памяти
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    path = config.get('Settings', 'outbox_file', fallback=DEFAULT_OUTBOX_FILE).strip()
+    return path or None
+
+def load_calendar_file(filename='config.ini'):
+    """
+    Возвращает путь к локальному календарю (.ics)
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Путь к .ics файлу или None, если подавление по календарю отключено
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    path = config.get('Settings', 'calendar_file', fallback=DEFAULT_CALENDAR_FILE).strip()
+    return os.path.expanduser(path) if path else None
+
+def load_schedule(filename='config.ini'):
+    """
+    Загружает и компилирует секцию [Schedule] (рабочие и тихие часы, исключения)
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        work_schedule.WeeklySchedule или None, если расписание не задано или некорректно
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    try:
+        return compile_schedule(
+            working_hours=config.get('Schedule', 'working_hours', fallback=''),
+            quiet_hours=config.get('Schedule', 'quiet_hours', fallback=''),
+            exceptions=config.get('Schedule', 'exceptions', fallback=''),
+        )
+    except ScheduleError as e:
+        logging.error(_log('schedule_invalid', error=e))
+        return None
+
+def load_sync_settings(filename='config.ini'):
+    """
+    Загружает секцию [Sync] (согласование таймера между машинами)
+
+    Args:
+        filename: Путь к файлу конфигурации
+
+    Returns:
+        Кортеж (listen, peers, secret) или None, если синхронизация выключена или настроена неверно
+    """
+    config = configparser.ConfigParser()
+    config.read(filename, encoding='utf-8')
+    peers_setting = config.get('Sync', 'peers', fallback='').strip()
+    if not peers_setting:
+        return None
+    try:
+        listen = parse_address(config.get('Sync', 'listen', fallback=f'0.0.0.0:{DEFAULT_PORT}'))
+        peers = [parse_address(peer) for peer in peers_setting.split(',') if peer.strip()]
+    except ValueError as e:
+        logging.error(_log('sync_invalid', error=e))
+        return None
+    secret = config.get('Sync', 'secret', fallback='')
+    if not secret:
+        # Без секрета любой узел в сети мог бы ставить паузу и менять интервал
+        logging.error(_log('sync_invalid', error=_log('sync_secret_required')))
+        return None
+    return listen, peers, secret
@@ -0,0 +1,370 @@
+"""Безголовый демон напоминаний для многих пользователей одного сервера"""
+import configparser
+import datetime
+import glob
+import heapq
+import itertools
+import os
+import queue
+import random
+import signal
+import stat
+import threading
+import time
+import tracemalloc
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from i18n import translator, set_language
+from cli import parse_args
+from config import get_language, load_config
+from notifiers import init_session_notifier
+from logging_config import setup_logging
+from templates import FireContext, render
+
+DEFAULT_USERS_GLOB = '/home/*/.config/eyecare/config.ini'
+DEFAULT_WORKERS = 4
+
+_log = translator('daemon')
+
+class UserSchedule:
+    """
+    Расписание одного пользователя: минимальное состояние без трея и таймерного потока
+
+    Атрибуты interval_minutes, last_fire, breaks_today и breaks_day читают
+    провайдеры шаблонов ({interval}, {work_minutes}, {breaks_today}), как у TrayManager.
+    """
+
+    __slots__ = ('name', 'interval', 'messages', 'mode', 'idx', 'notify',
+                 'started_at', '_last_fire', 'breaks_today', 'breaks_day')
+
+    def __init__(self, name: str, interval: float, messages: Tuple[str, ...], mode: str,
+                 notify: Callable[[str], None]):
+        self.name = name
+        self.interval = interval  # в секундах
+        self.messages = messages
+        self.mode = mode
+        self.idx = 0
+        self.notify = notify
+        self.started_at = time.time()
+        self._last_fire = 0.0
+        self.breaks_today = 0
+        self.breaks_day = None
+
+    def adopt(self, previous: 'UserSchedule') -> None:
+        """Переносит счетчики с прежнего расписания того же пользователя (при перезагрузке конфигов)"""
+        self.idx = previous.idx
+        self.started_at = previous.started_at
+        self._last_fire = previous._last_fire
+        self.breaks_today = previous.breaks_today
+        self.breaks_day = previous.breaks_day
+
+    @property
+    def interval_minutes(self) -> int:
+        """Интервал в минутах (для подстановки {interval})"""
+        return int(self.interval // 60)
+
+    @property
+    def last_fire(self) -> float:
+        """Время последнего напоминания или запуска демона"""
+        return self._last_fire or self.started_at
+
+    def next_message(self) -> str:
+        """
+        Выбирает сообщение по режиму пользователя и учитывает срабатывание
+
+        Вызывается из рабочего потока, за которым закреплен пользователь,
+        поэтому счетчики не требуют блокировки.
+        """
+        if self.mode == 'random':
+            msg = random.choice(self.messages)
+        else:
+            msg = self.messages[self.idx % len(self.messages)]
+        self.idx += 1
+        # Как в TrayManager: подстановки видят состояние до этого срабатывания
+        text = render(msg, FireContext(self))
+        self._last_fire = time.time()
+        today = datetime.date.today()
+        if self.breaks_day != today:
+            self.breaks_day = today
+            self.breaks_today = 0
+        self.breaks_today += 1
+        return text
+
+class Scheduler:
+    """
+    Общий планировщик: одна куча сроков и один поток ожидания на всех пользователей
+
+    Поток планировщика спит до ближайшего срока, а не тикает раз в секунду;
+    доставка шардируется по пулу рабочих потоков по имени пользователя,
+    так что медленный notify-send одного пользователя не задерживает остальных
+    и уведомления одного пользователя не переупорядочиваются.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, clock: Callable[[], float] = time.monotonic,
+                 on_fired: Optional[Callable[[UserSchedule, float], None]] = None):
+        self._clock = clock
+        self._heap = []  # (срок, порядковый номер, UserSchedule)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._on_fired = on_fired
+        self._queues = [queue.SimpleQueue() for _ in range(max(1, workers))]
+        self._threads = []
+
+    def add(self, user: UserSchedule, first_due: Optional[float] = None) -> None:
+        """Добавляет пользователя; первый срок по умолчанию через полный интервал"""
+        due = self._clock() + user.interval if first_due is None else first_due
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), user))
+            self._cond.notify()
+
+    def replace(self, users: List[UserSchedule]) -> None:
+        """
+        Заменяет набор пользователей (перезагрузка конфигов)
+
+        У пользователей, которые уже были, сохраняются срок и счетчики; если
+        интервал сократился, новый срок наступает не позже чем через него.
+        """
+        now = self._clock()
+        with self._cond:
+            previous = {user.name: (due, user) for due, _, user in self._heap}
+            self._heap = []
+            for user in users:
+                due, old = previous.get(user.name, (now + user.interval, None))
+                if old is not None:
+                    user.adopt(old)
+                    due = min(due, now + user.interval)
+                heapq.heappush(self._heap, (due, next(self._seq), user))
+            self._cond.notify()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def start(self) -> None:
+        """Запускает поток планировщика и рабочие потоки"""
+        self._running = True
+        for q in self._queues:
+            t = threading.Thread(target=self._worker, args=(q,), daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._dispatch, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self) -> None:
+        """Останавливает планировщик и дожидается рабочих потоков"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _dispatch(self) -> None:
+        with self._cond:
+            while self._running:
+                now = self._clock()
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, user = heapq.heappop(self._heap)
+                    self._queues[hash(user.name) % len(self._queues)].put((user, due))
+                    # Следующий срок считаем от планового, а не от фактического времени,
+                    # чтобы не накапливать дрейф; после долгого простоя пропускаем вперед
+                    next_due = due + user.interval
+                    if next_due <= now:
+                        next_due = now + user.interval
+                    heapq.heappush(self._heap, (next_due, next(self._seq), user))
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+
+    def _worker(self, q: 'queue.SimpleQueue') -> None:
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            user, due = item
+            if self._on_fired is not None:
+                self._on_fired(user, self._clock() - due)
+            try:
+                user.notify(user.next_message())
+            except Exception as e:
+                logging.error(_log('daemon_deliver_error', user=user.name, error=e))
+
+def _config_owner(path: str):
+    """
+    Проверяет, что конфиг - обычный файл владельца того домашнего каталога, где он найден
+
+    Иначе пользователь мог бы подложить символическую ссылку (или жесткую
+    ссылку на чужой файл) и заставить демон слать уведомления в чужую сессию.
+
+    Args:
+        path: Путь, найденный по glob-шаблону
+
+    Returns:
+        Кортеж (stat файла, запись pwd владельца)
+
+    Raises:
+        PermissionError: Файл - ссылка, не обычный файл или лежит вне домашнего каталога владельца
+    """
+    import pwd
+
+    st = os.lstat(path)
+    if not stat.S_ISREG(st.st_mode):
+        raise PermissionError(_log('daemon_not_regular'))
+    owner = pwd.getpwuid(st.st_uid)
+    home = os.path.realpath(owner.pw_dir)
+
+    def inside(target: str, directory: str) -> bool:
+        return os.path.commonpath([target, directory]) == directory
+
+    found_in_home = inside(os.path.abspath(path), os.path.abspath(owner.pw_dir)) or inside(os.path.abspath(path), home)
+    if not (found_in_home and inside(os.path.realpath(path), home)) or os.stat(home).st_uid != st.st_uid:
+        raise PermissionError(_log('daemon_foreign_file', user=owner.pw_name))
+    return st, owner
+
+def load_users(pattern: str = DEFAULT_USERS_GLOB) -> List[UserSchedule]:
+    """
+    Загружает расписания пользователей из их config.ini
+
+    Владелец файла конфигурации определяет, в чью сессию доставлять уведомления,
+    поэтому файл должен быть обычным файлом (не ссылкой) в домашнем каталоге
+    этого владельца. Одинаковые наборы сообщений разделяются между пользователями.
+
+    Args:
+        pattern: glob-шаблон путей к пользовательским конфигам
+
+    Returns:
+        Список UserSchedule
+    """
+    shared: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+    users = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            st, owner = _config_owner(path)
+            name = owner.pw_name
+            interval, messages, mode, _ = load_config(filename=path)
+        except (OSError, KeyError, ValueError, configparser.Error) as e:
+            # Файлы пишут сами пользователи: ошибка одного не должна останавливать демон для всех
+            logging.warning(_log('daemon_user_error', path=path, error=e))
+            continue
+        messages = shared.setdefault(tuple(messages), tuple(messages))
+        notify = init_session_notifier(st.st_uid, st.st_gid)
+        users.append(UserSchedule(name, interval * 60, messages, mode, notify))
+        logging.debug(_log('daemon_user', user=name, interval=interval, mode=mode))
+    return users
+
+def run_daemon(pattern: str = DEFAULT_USERS_GLOB, workers: int = DEFAULT_WORKERS) -> None:
+    """Запускает демон и блокируется до SIGINT/SIGTERM; SIGHUP перечитывает конфиги пользователей"""
+    users = load_users(pattern)
+    if not users:
+        logging.warning(_log('daemon_no_users', pattern=pattern))
+        return
+
+    scheduler = Scheduler(workers=workers)
+    for user in users:
+        scheduler.add(user)
+    logging.info(_log('daemon_start', users=len(users), workers=workers))
+
+    stop_event = threading.Event()
+    reload_event = threading.Event()
+    wake = threading.Event()
+
+    def on_signal(event):
+        def handler(signum, frame):
+            event.set()
+            wake.set()
+        return handler
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, on_signal(stop_event))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, on_signal(reload_event))
+    scheduler.start()
+    try:
+        while not stop_event.is_set():
+            wake.wait(3600)
+            wake.clear()
+            if reload_event.is_set() and not stop_event.is_set():
+                reload_event.clear()
+                # Перечитываем в основном потоке, не в обработчике: планировщик продолжает работать
+                users = load_users(pattern)
+                scheduler.replace(users)
+                logging.info(_log('daemon_reload', users=len(users)))
+    finally:
+        logging.info(_log('daemon_stop'))
+        scheduler.stop()
+
+def run_scale_test(users: int = 10000, workers: int = DEFAULT_WORKERS, duration: float = 10.0,
+                   max_interval: float = 5.0) -> Dict[str, float]:
+    """
+    Нагрузочный тест: users имитируемых пользователей с интервалами до max_interval секунд
+
+    Уведомления не отправляются; измеряются память на пользователя
+    (tracemalloc: расписание и его запись в куче) и опоздание срабатываний.
+
+    Returns:
+        Словарь с метриками (per_user_bytes, fired, p50_ms, p99_ms, max_ms)
+    """
+    lateness = []
+    lateness_lock = threading.Lock()
+
+    def on_fired(user, late):
+        with lateness_lock:
+            lateness.append(late)
+
+    def notify(msg):
+        pass
+
+    messages = ('Look away from the screen for 20 seconds.', 'Stretch a bit and rest your eyes.')
+    rng = random.Random(42)
+    scheduler = Scheduler(workers=workers, on_fired=on_fired)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    now = time.monotonic()
+    for i in range(users):
+        interval = rng.uniform(1.0, max_interval)
+        user = UserSchedule(f"user{i:05d}", interval, messages, 'sequential', notify)
+        scheduler.add(user, first_due=now + rng.uniform(0, interval))
+    total = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started = time.monotonic()
+    scheduler.start()
+    time.sleep(duration)
+    scheduler.stop()
+    elapsed = time.monotonic() - started
+
+    lateness.sort()
+    def pct(p):
+        return lateness[min(len(lateness) - 1, int(len(lateness) * p))] * 1000 if lateness else 0.0
+
+    result = {
+        'per_user_bytes': total / users,
+        'fired': len(lateness),
+        'p50_ms': pct(0.50),
+        'p99_ms': pct(0.99),
+        'max_ms': lateness[-1] * 1000 if lateness else 0.0,
+    }
+    print(_log('scale_users', users=users, workers=workers, duration=elapsed))
+    print(_log('scale_memory', per_user=result['per_user_bytes'], total=total / 1024))
+    print(_log('scale_fired', fired=result['fired'], rate=result['fired'] / elapsed))
+    print(_log('scale_lateness', p50=result['p50_ms'], p99=result['p99_ms'], max=result['max_ms']))
+    return result
+
+def main():
+    """Точка входа демона"""
+    args = parse_args()
+    lang = get_language(lang_override=args.lang)
+    set_language(lang)
+    setup_logging(verbose=args.verbose)
+
+    if args.scale_test:
+        run_scale_test(users=args.scale_test, workers=args.workers)
+    else:
+        run_daemon(pattern=args.users_glob, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
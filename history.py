@@ -0,0 +1,193 @@
+"""Журнал событий напоминаний (SQLite) с пакетной записью и дневными сводками"""
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import List, Optional, Tuple
+
+from i18n import translator
+
+# Типы событий
+EVENT_AUTO = 'auto'
+EVENT_MANUAL = 'manual'
+EVENT_PAUSE = 'pause'
+EVENT_RESUME = 'resume'
+EVENT_INTERVAL = 'interval'
+EVENT_QUIT = 'quit'
+
+BATCH_SIZE = 64  # Максимум событий в одной транзакции
+FLUSH_INTERVAL = 5.0  # Таймаут ожидания очереди потоком записи; события пишутся сразу, без задержки
+QUEUE_LIMIT = 10000  # Ограничение очереди, чтобы не расти при недоступном диске
+
+# Колонка дневной сводки, которую увеличивает каждый тип события
+_ROLLUP_COLUMNS = {
+    EVENT_AUTO: 'auto_count',
+    EVENT_MANUAL: 'manual_count',
+    EVENT_PAUSE: 'pause_count',
+    EVENT_RESUME: 'resume_count',
+    EVENT_INTERVAL: 'interval_changes',
+    EVENT_QUIT: 'quit_count',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    value INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT PRIMARY KEY,
+    auto_count INTEGER NOT NULL DEFAULT 0,
+    manual_count INTEGER NOT NULL DEFAULT 0,
+    pause_count INTEGER NOT NULL DEFAULT 0,
+    resume_count INTEGER NOT NULL DEFAULT 0,
+    interval_changes INTEGER NOT NULL DEFAULT 0,
+    quit_count INTEGER NOT NULL DEFAULT 0,
+    paused_seconds INTEGER NOT NULL DEFAULT 0,
+    interval_sum INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_log = translator('history')
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _day(ts: float) -> str:
+    return datetime.date.fromtimestamp(ts).isoformat()
+
+class HistoryStore:
+    """
+    Журнал событий только на добавление
+
+    record() лишь кладет событие в очередь; фоновый поток пишет события
+    пачками в одной транзакции вместе с приращениями дневной сводки, так что
+    отчет читает одну строку на день, не пересчитывая сырые события.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.Queue(maxsize=QUEUE_LIMIT)
+        self._stop = object()
+        # Схему создаем сразу, чтобы ошибки пути проявились при запуске
+        _connect(path).close()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        logging.debug(_log('history_opened', path=path))
+
+    def record(self, kind: str, value: Optional[int] = None, ts: Optional[float] = None) -> None:
+        """
+        Добавляет событие в очередь на запись
+
+        Args:
+            kind: Тип события (EVENT_*)
+            value: Числовое значение (интервал в минутах, длительность паузы в секундах)
+            ts: Время события (unix time), по умолчанию текущее
+        """
+        try:
+            self._queue.put_nowait((time.time() if ts is None else ts, kind, value))
+        except queue.Full:
+            logging.warning(_log('history_dropped', kind=kind))
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает поток записи"""
+        if self._thread is None:
+            return
+        self._queue.put(self._stop)
+        self._thread.join()
+        self._thread = None
+
+    def _writer(self) -> None:
+        conn = _connect(self.path)
+        try:
+            running = True
+            while running:
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    continue
+                batch = []
+                # Добираем все, что уже накопилось, но не больше BATCH_SIZE
+                while item is not None:
+                    if item is self._stop:
+                        running = False
+                        break
+                    batch.append(item)
+                    if len(batch) >= BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                if batch:
+                    self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, batch: List[Tuple[float, str, Optional[int]]]) -> None:
+        try:
+            with conn:
+                conn.executemany('INSERT INTO events (ts, kind, value) VALUES (?, ?, ?)', batch)
+                for ts, kind, value in batch:
+                    column = _ROLLUP_COLUMNS.get(kind)
+                    if column is None:
+                        continue
+                    day = _day(ts)
+                    conn.execute('INSERT OR IGNORE INTO daily (day) VALUES (?)', (day,))
+                    extra = ''
+                    if kind == EVENT_AUTO and value:
+                        extra = ', interval_sum = interval_sum + :value'
+                    elif kind == EVENT_RESUME and value:
+                        extra = ', paused_seconds = paused_seconds + :value'
+                    conn.execute(f'UPDATE daily SET {column} = {column} + 1{extra} WHERE day = :day',
+                                 {'day': day, 'value': value})
+        except sqlite3.Error as e:
+            logging.error(_log('history_error', error=e))
+
+def daily_stats(path: str, days: int = 30) -> List[sqlite3.Row]:
+    """
+    Возвращает дневные сводки за последние days дней (по индексу дня, без сырых событий)
+
+    Args:
+        path: Путь к базе журнала
+        days: Глубина отчета в днях
+
+    Returns:
+        Список строк таблицы daily, от старых к новым
+    """
+    since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    conn = _connect(path)
+    try:
+        conn.row_factory = sqlite3.Row
+        return conn.execute('SELECT * FROM daily WHERE day >= ? ORDER BY day', (since,)).fetchall()
+    finally:
+        conn.close()
+
+def format_report(rows: List[sqlite3.Row], days: int) -> str:
+    """Форматирует дневные сводки в текстовый отчет"""
+    lines = [_log('report_header', days=days)]
+    if not rows:
+        lines.append(_log('report_empty'))
+        return '\n'.join(lines)
+
+    lines.append(_log('report_columns'))
+    totals = {'auto': 0, 'manual': 0, 'pauses': 0, 'paused': 0}
+    for row in rows:
+        avg = f"{row['interval_sum'] / row['auto_count']:.1f}" if row['auto_count'] else '-'
+        paused_min = row['paused_seconds'] // 60
+        lines.append(f"{row['day']}  {row['auto_count']:>4}  {row['manual_count']:>7}  "
+                     f"{row['pause_count']:>5}  {paused_min:>10}  {row['interval_changes']:>9}  {avg:>12}")
+        totals['auto'] += row['auto_count']
+        totals['manual'] += row['manual_count']
+        totals['pauses'] += row['pause_count']
+        totals['paused'] += paused_min
+    lines.append(_log('report_total', **totals))
+    return '\n'.join(lines)
@@ -0,0 +1,154 @@
+"""Единый каталог сообщений интерфейса и логов"""
+import marshal
+import os
+from typing import Callable, Dict, List, Optional
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+CACHE_DIR = os.path.join(LOCALES_DIR, '__cache__')
+FALLBACK_LANGUAGE = 'en'
+_CACHE_VERSION = 1
+
+_lang = FALLBACK_LANGUAGE
+_catalog: Dict[str, str] = {}
+_fallback: Optional[Dict[str, str]] = None  # Загружается лениво, только при отсутствии ключа
+
+def available_languages() -> List[str]:
+    """Возвращает коды языков, для которых есть файлы locales/<код>.ini"""
+    try:
+        return sorted(name[:-4] for name in os.listdir(LOCALES_DIR) if name.endswith('.ini'))
+    except OSError:
+        return [FALLBACK_LANGUAGE]
+
+def _parse(path: str) -> Dict[str, str]:
+    """Разбирает файл каталога: [section] и key = value, ключи сворачиваются в "section.key" """
+    table = {}
+    section = ''
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1].strip()
+                continue
+            key, sep, value = line.partition('=')
+            if not sep:
+                continue
+            table[f"{section}.{key.strip()}"] = value.strip().replace('\\n', '\n')
+    return table
+
+def compile_language(lang: str) -> Dict[str, str]:
+    """
+    Загружает каталог языка из скомпилированного кэша или компилирует его
+
+    Кэш (marshal) проверяется по mtime и размеру исходного .ini; если каталог
+    недоступен для записи, каталог просто разбирается при каждом запуске.
+
+    Args:
+        lang: Код языка
+
+    Returns:
+        Словарь "section.key" -> строка
+    """
+    source = os.path.join(LOCALES_DIR, f'{lang}.ini')
+    st = os.stat(source)
+    signature = (_CACHE_VERSION, st.st_mtime_ns, st.st_size)
+    cache = os.path.join(CACHE_DIR, f'{lang}.marshal')
+    try:
+        with open(cache, 'rb') as f:
+            cached_signature, table = marshal.load(f)
+        if tuple(cached_signature) == signature:
+            return table
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    table = _parse(source)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f'{cache}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            marshal.dump((signature, table), f)
+        os.replace(tmp, cache)
+    except OSError:
+        pass
+    return table
+
+def set_language(lang: str) -> str:
+    """
+    Загружает каталог активного языка (только его)
+
+    Args:
+        lang: Код языка; при отсутствии файла используется английский
+
+    Returns:
+        Фактически выбранный язык
+    """
+    global _lang, _catalog, _fallback
+    if lang not in available_languages():
+        lang = FALLBACK_LANGUAGE
+    _catalog = compile_language(lang)
+    _lang = lang
+    _fallback = _catalog if lang == FALLBACK_LANGUAGE else None
+    return lang
+
+def get_language() -> str:
+    """Возвращает активный язык каталога"""
+    return _lang
+
+def prune_catalog(sections=(), key_prefixes=()) -> int:
+    """
+    Удаляет из активного каталога строки, которые больше не понадобятся
+
+    Загруженный лениво английский каталог тоже освобождается: если строка
+    все же понадобится, _lookup загрузит его заново.
+
+    Args:
+        sections: Секции целиком (например, строки режимов, которые уже не запустятся)
+        key_prefixes: Начала ключей внутри любых секций (например, 'test_')
+
+    Returns:
+        Число удаленных строк
+    """
+    global _catalog, _fallback
+    section_prefixes = tuple(section + '.' for section in sections)
+    key_prefixes = tuple(key_prefixes)
+    kept = {key: value for key, value in _catalog.items()
+            if not key.startswith(section_prefixes) and not key.partition('.')[2].startswith(key_prefixes)}
+    removed = len(_catalog) - len(kept)
+    _catalog = kept
+    _fallback = _catalog if _lang == FALLBACK_LANGUAGE else None
+    return removed
+
+def _lookup(key: str) -> str:
+    global _fallback
+    value = _catalog.get(key)
+    if value is not None:
+        return value
+    if _fallback is None:
+        _fallback = compile_language(FALLBACK_LANGUAGE)
+    return _fallback.get(key, key)
+
+def tr(key: str, **kwargs) -> str:
+    """
+    Возвращает локализованную строку
+
+    Args:
+        key: Полный ключ "section.key"
+        **kwargs: Параметры для форматирования
+
+    Returns:
+        Отформатированная строка (или сам ключ, если он не найден ни в одном каталоге)
+    """
+    value = _lookup(key)
+    return value.format(**kwargs) if kwargs else value
+
+def translator(section: str) -> Callable[..., str]:
+    """Возвращает функцию _log(key, **kwargs) для секции каталога"""
+    prefix = section + '.'
+
+    def _log(key: str, **kwargs) -> str:
+        value = _catalog.get(prefix + key)
+        if value is None:
+            value = _lookup(prefix + key)
+        return value.format(**kwargs) if kwargs else value
+    return _log
@@ -1,21 +1,58 @@
 """Главный модуль приложения EyeCare Reminder"""
 import time
+import datetime
 import random
 import signal
+import sqlite3
 import threading
 import logging
-from PIL import Image, ImageDraw
+from PIL import Image
 import pystray
 
+from i18n import set_language, tr
 from cli import parse_args
-from config import get_language, load_config, save_interval, MIN_INTERVAL, MAX_INTERVAL, set_log_language as set_config_log_language
-from notifiers import init_notifier, set_log_language as set_notifier_log_language
-from logging_config import setup_logging, set_log_language, log
+from config import get_language, load_config, load_idle_settings, load_history_file, load_state_file, load_calendar_file, load_schedule, load_sync_settings, load_outbox_file, save_interval, MIN_INTERVAL, MAX_INTERVAL
+from notifiers import select_notifier
+from outbox import Outbox
+from activity import init_activity_source, run_selftest as run_activity_selftest
+from history import (HistoryStore, daily_stats, format_report,
+                     EVENT_AUTO, EVENT_MANUAL, EVENT_PAUSE, EVENT_RESUME, EVENT_INTERVAL, EVENT_QUIT)
+from logging_config import setup_logging, log
+from state import StateStore, TimerState
+from templates import FireContext, render
+from calendar_ics import CalendarIndex, run_benchmark as run_calendar_benchmark
+from memstats import MemoryReporter, apply_lean, run_lean_benchmark
+from peer_sync import PeerSync, SharedState, run_loopback_test
+from systemd_notify import STALLED, SystemdNotifier, run_selftest as run_sd_notify_selftest
 
-def create_tray_icon():
-    """Создает простую иконку для системного трея"""
+RESUME_GRACE_SECONDS = 300  # Насколько просроченное сохраненное срабатывание еще показывается
+RESUME_OVERDUE_DELAY = 30  # Задержка показа просроченного напоминания после запуска
+SCHEDULE_RECHECK_SECONDS = 300  # Максимальный сон вне рабочих часов (на случай сна ПК и смены часов)
+SYNC_FOLLOWER_RECHECK = 15  # Ведомая машина в срок ждет обновления от ведущей столько секунд и проверяет снова
+
+def _draw_ellipse(image, box, fill):
+    """Закрашивает эллипс в рамке box (включительно) средствами Image, без ImageDraw"""
+    x0, y0, x1, y1 = box
+    disc = Image.radial_gradient('L').point(lambda v: 255 if v < 181 else 0)  # 181 - край вписанного круга
+    image.paste(fill, (x0, y0, x1 + 1, y1 + 1), disc.resize((x1 - x0 + 1, y1 - y0 + 1), Image.NEAREST))
+
+def create_tray_icon(lean=False):
+    """
+    Создает простую иконку для системного трея
+
+    Args:
+        lean: Рисовать без ImageDraw: экономный режим не загружает его и FreeType
+    """
     # Создаем изображение 64x64 с прозрачным фоном
     image = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+    if lean:
+        # Тот же глаз: обводка шириной 2, белок, зрачок и блик
+        _draw_ellipse(image, [8, 16, 56, 48], (50, 100, 150, 255))
+        _draw_ellipse(image, [10, 18, 54, 46], (100, 150, 200, 255))
+        _draw_ellipse(image, [24, 28, 40, 36], (50, 50, 50, 255))
+        _draw_ellipse(image, [28, 30, 32, 32], (255, 255, 255, 255))
+        return image
+    from PIL import ImageDraw
     draw = ImageDraw.Draw(image)
     
     # Рисуем простую иконку глаза
@@ -30,14 +67,60 @@ def create_tray_icon():
 
 class TrayManager:
     """Менеджер системного трея"""
+
+    # Долгоживущий объект: без __dict__ на экземпляр
+    __slots__ = (
+        'notify', 'messages', 'mode', 'lang', 'idx', 'paused', 'running',
+        'interval_minutes', '_seconds_left', '_lock',
+        'activity', 'idle_pause_minutes', 'idle_reset_minutes', 'idle_paused', '_idle_peak',
+        'history', '_paused_at', 'memory_reporter', 'state', '_last_fire',
+        'started_at', 'breaks_today', 'breaks_day', 'calendar', 'schedule', 'off_hours', '_wake', 'sync',
+        'outbox', 'ticks', 'max_sleep',
+        'pause_menu_item', 'menu', 'icon',
+    )
     
-    def __init__(self, notify_func, messages, mode, lang):
+    def __init__(self, notify_func, messages, mode, lang, activity=None, idle_pause_minutes=0, idle_reset_minutes=0,
+                 history=None, state=None, calendar=None, schedule=None, sync=None, icon_factory=None,
+                 lean=False):
         self.notify = notify_func
         self.messages = messages
         self.mode = mode
         self.lang = lang
         self.idx = 0
         self.paused = False
+        # Авто-пауза при простое (activity - экземпляр activity.ActivitySource)
+        self.activity = activity
+        self.idle_pause_minutes = idle_pause_minutes
+        self.idle_reset_minutes = idle_reset_minutes
+        self.idle_paused = False
+        self._idle_peak = 0.0
+        # Журнал событий (history.HistoryStore) и момент начала ручной паузы
+        self.history = history
+        self._paused_at = None
+        # Периодический отчет о памяти (memstats.MemoryReporter), если включен
+        self.memory_reporter = None
+        # Очередь доставки (outbox.Outbox), если notify_func - ее submit
+        self.outbox = None
+        # Сохранение состояния таймера между перезапусками (state.StateStore)
+        self.state = state
+        self._last_fire = 0.0
+        # Данные для провайдеров шаблонов (templates.PROVIDERS)
+        self.started_at = time.time()
+        self.breaks_today = 0
+        self.breaks_day = None
+        # Календарь занятости (calendar_ics.CalendarIndex): напоминание откладывается до конца встречи
+        self.calendar = calendar
+        # Рабочие/тихие часы (work_schedule.WeeklySchedule): вне них таймер спит
+        self.schedule = schedule
+        self.off_hours = False
+        self._wake = threading.Event()
+        # Счетчик тиков - признак живого таймерного потока (для watchdog systemd)
+        self.ticks = 0
+        self.max_sleep = SCHEDULE_RECHECK_SECONDS  # Максимальное ожидание внутри одного тика
+        # Согласование с другими машинами пользователя (peer_sync.PeerSync): напоминание показывает одна
+        self.sync = sync
+        if sync is not None:
+            sync.on_state = self._apply_sync_state
         self.running = True
         self.interval_minutes = None  # будет присвоено в start_timer_thread
         self._seconds_left = None
@@ -46,7 +129,7 @@ class TrayManager:
         # Подменю выбора интервала
         preset_intervals = [10, 15, 20, 30, 45, 60]
         def make_interval_item(minutes):
-            label = f"{minutes} min" if self.lang == 'en' else f"{minutes} мин"
+            label = tr('ui.interval_item', minutes=minutes)
             def on_select(icon, item):
                 self.set_interval(minutes)
             def is_checked(item):
@@ -59,17 +142,17 @@ class TrayManager:
         self.pause_menu_item = pystray.MenuItem(self._pause_label, self.toggle_pause)
         self.menu = pystray.Menu(
             self.pause_menu_item,
-            pystray.MenuItem("Check now" if lang == 'en' else "Проверить сейчас", self.check_now),
-            pystray.MenuItem("Interval" if lang == 'en' else "Интервал", interval_submenu),
+            pystray.MenuItem(tr('ui.menu_check_now'), self.check_now),
+            pystray.MenuItem(tr('ui.menu_interval'), interval_submenu),
             pystray.Menu.SEPARATOR,
-            pystray.MenuItem("Exit" if lang == 'en' else "Выход", self.quit_app)
+            pystray.MenuItem(tr('ui.menu_exit'), self.quit_app)
         )
         
-        # Создаем иконку трея
-        self.icon = pystray.Icon(
+        # Создаем иконку трея (icon_factory подменяет pystray.Icon, например в soak.py)
+        self.icon = (icon_factory or pystray.Icon)(
             "EyeCare",
-            create_tray_icon(),
-            "EyeCare Reminder",
+            create_tray_icon(lean),
+            tr('ui.tooltip_title'),
             self.menu
         )
     
@@ -79,26 +162,24 @@ class TrayManager:
             return ""
         
         if self.paused:
-            if self.lang == 'en':
-                return "Paused"
-            return "Приостановлено"
+            return tr('ui.status_paused')
+
+        if self.idle_paused:
+            return tr('ui.status_idle')
+
+        if self.off_hours:
+            return tr('ui.status_off_hours')
         
         hours = seconds // 3600
         minutes = (seconds % 3600) // 60
         secs = seconds % 60
         
         if hours > 0:
-            if self.lang == 'en':
-                return f"{hours}h {minutes}m {secs}s"
-            return f"{hours}ч {minutes}м {secs}с"
+            return tr('ui.time_hms', hours=hours, minutes=minutes, seconds=secs)
         elif minutes > 0:
-            if self.lang == 'en':
-                return f"{minutes}m {secs}s"
-            return f"{minutes}м {secs}с"
+            return tr('ui.time_ms', minutes=minutes, seconds=secs)
         else:
-            if self.lang == 'en':
-                return f"{secs}s"
-            return f"{secs}с"
+            return tr('ui.time_s', seconds=secs)
     
     def _update_tooltip(self):
         """Обновляет tooltip иконки с оставшимся временем"""
@@ -108,52 +189,217 @@ class TrayManager:
                 interval = self.interval_minutes
             
             if seconds_left is None or interval is None:
-                tooltip = "EyeCare Reminder"
+                tooltip = tr('ui.tooltip_title')
             else:
-                time_str = self._format_time_left(seconds_left)
-                if self.lang == 'en':
-                    tooltip = f"EyeCare Reminder\nNext notification in: {time_str}"
-                else:
-                    tooltip = f"EyeCare Reminder\nСледующее уведомление через: {time_str}"
+                tooltip = tr('ui.tooltip_next', time=self._format_time_left(seconds_left))
             
             if hasattr(self, 'icon') and self.icon is not None:
                 self.icon.title = tooltip
         except Exception as e:
-            logging.debug(f"Не удалось обновить tooltip: {e}")
+            logging.debug(log('tooltip_error', error=e))
     
+    def _check_idle(self):
+        """
+        Обновляет состояние авто-паузы по источнику активности
+
+        Returns:
+            True, если пользователь сейчас отсутствует и отсчет нужно остановить
+        """
+        if self.activity is None or not self.idle_pause_minutes:
+            return False
+
+        idle = self.activity.idle_seconds()
+        if idle >= self.idle_pause_minutes * 60:
+            self._idle_peak = max(self._idle_peak, idle)
+            if not self.idle_paused:
+                self.idle_paused = True
+                logging.info(log('idle_pause', minutes=int(idle // 60)))
+                if self.sync is not None:
+                    self.sync.set_idle(True)
+            # Пользователь работает за другой машиной: общий отсчет не останавливаем
+            return self.sync is None or not self.sync.peer_active()
+
+        if self.idle_paused:
+            self.idle_paused = False
+            absent = self._idle_peak
+            self._idle_peak = 0.0
+            if self.sync is not None:
+                self.sync.set_idle(False)
+            if self.sync is not None and self.sync.peer_active():
+                # Отсутствие здесь - не перерыв: пользователь был за другой машиной
+                logging.info(log('idle_resume'))
+            elif self.idle_reset_minutes and absent >= self.idle_reset_minutes * 60:
+                # Отсутствие не короче перерыва: глаза уже отдохнули, начинаем цикл заново
+                with self._lock:
+                    self._seconds_left = self.interval_minutes * 60
+                logging.info(log('idle_reset', minutes=int(absent // 60)))
+                self._checkpoint()
+            else:
+                logging.info(log('idle_resume'))
+        return False
+
+    def _checkpoint(self):
+        """Сохраняет состояние таймера и рассылает его пирам; вызывается только при смене состояния"""
+        if self.state is None and self.sync is None:
+            return
+        with self._lock:
+            seconds_left = self._seconds_left
+            interval = self.interval_minutes
+        if seconds_left is None or interval is None:
+            return
+        deadline = round(time.time()) + seconds_left
+        if self.state is not None:
+            self.state.save(TimerState(self.paused, interval, self.idx, deadline, seconds_left, self._last_fire))
+        if self.sync is not None:
+            self.sync.publish(SharedState(self.paused, interval, deadline))
+
+    def _apply_sync_state(self, shared):
+        """Применяет общее состояние, пришедшее от другой машины (вызывается из потока синхронизации)"""
+        if self.interval_minutes is None:
+            return
+        interval_changed = shared.interval_minutes != self.interval_minutes
+        with self._lock:
+            self.interval_minutes = shared.interval_minutes
+            left = round(shared.deadline - time.time())
+            self._seconds_left = int(min(max(1, left), shared.interval_minutes * 60))
+        if shared.paused != self.paused:
+            # В журнал пауза попадает только на машине, где ее включили
+            self.paused = shared.paused
+            self._paused_at = None
+            try:
+                self.icon.update_menu()
+            except Exception:
+                logging.debug(log('menu_update_error'))
+        if interval_changed:
+            save_interval(shared.interval_minutes)
+        logging.info(log('sync_applied', paused=shared.paused, interval=shared.interval_minutes,
+                         seconds=self._seconds_left))
+        self._checkpoint()
+        self._update_tooltip()
+
+    def _restore_seconds_left(self, interval):
+        """
+        Восстанавливает текущий цикл из сохраненного состояния
+
+        Returns:
+            Сколько секунд осталось до срабатывания
+        """
+        full = interval * 60
+        saved = self.state.load() if self.state is not None else None
+        if saved is None:
+            return full
+        self.idx = saved.idx
+        self._last_fire = saved.last_fire
+        if saved.interval_minutes != interval:
+            # Интервал изменили в конфиге вне приложения: начинаем цикл заново
+            return full
+        if saved.paused:
+            self.paused = True
+            seconds_left = saved.seconds_left
+        else:
+            overdue = time.time() - saved.deadline
+            if overdue <= 0:
+                seconds_left = -overdue
+            elif overdue <= RESUME_GRACE_SECONDS:
+                seconds_left = RESUME_OVERDUE_DELAY
+            else:
+                # Пропущенный срок давно прошел: пользователя не было, цикл заново
+                return full
+        seconds_left = int(min(max(seconds_left, 1), full))
+        logging.info(log('state_resumed', seconds=seconds_left, paused=self.paused))
+        return seconds_left
+
+    @property
+    def last_fire(self):
+        """Время последнего перерыва (unix time); до первого - время запуска"""
+        return self._last_fire or self.started_at
+
+    def _next_message(self):
+        """Выбирает следующее сообщение и подставляет значения шаблона"""
+        msg = random.choice(self.messages) if self.mode == 'random' else self.messages[self.idx % len(self.messages)]
+        self.idx += 1
+        return render(msg, FireContext(self))
+
+    def _wait_for_schedule(self):
+        """
+        Проверяет расписание; вне рабочих часов спит до их начала без посекундного отсчета
+
+        Returns:
+            True, если сейчас нерабочее время и тик нужно пропустить
+        """
+        if self.schedule is None:
+            return False
+        if self.schedule.is_active():
+            if self.off_hours:
+                # Начало рабочего периода - начинаем цикл заново
+                self.off_hours = False
+                with self._lock:
+                    self._seconds_left = self.interval_minutes * 60
+                logging.info(log('schedule_active'))
+                self._checkpoint()
+            return False
+
+        wake_at = self.schedule.next_active()
+        if not self.off_hours:
+            self.off_hours = True
+            until = time.strftime('%Y-%m-%d %H:%M', time.localtime(wake_at)) if wake_at else '-'
+            logging.info(log('schedule_inactive', until=until))
+            self._update_tooltip()
+        timeout = SCHEDULE_RECHECK_SECONDS if wake_at is None else wake_at - time.time()
+        self._wake.wait(min(max(1, timeout), self.max_sleep))
+        return True
+
+    def _record(self, kind, value=None):
+        """Записывает событие в журнал, если он включен"""
+        if self.history is not None:
+            self.history.record(kind, value)
+
     def toggle_pause(self, icon=None, item=None):
         """Переключает состояние паузы"""
         self.paused = not self.paused
-        status = "Paused" if self.lang == 'en' else "Приостановлено"
-        if not self.paused:
-            status = "Resumed" if self.lang == 'en' else "Возобновлено"
+        if self.paused:
+            self._paused_at = time.monotonic()
+            self._record(EVENT_PAUSE)
+        else:
+            paused_for = int(time.monotonic() - self._paused_at) if self._paused_at is not None else None
+            self._paused_at = None
+            self._record(EVENT_RESUME, paused_for)
+        status = tr('ui.status_paused' if self.paused else 'ui.status_resumed')
         logging.info(log('pause_enabled' if self.paused else 'pause_disabled'))
-        self.notify(status)
+        self._checkpoint()
+        self._notify_status(status)
         # Обновляем меню, если иконка уже создана
         if hasattr(self, 'icon') and hasattr(self.icon, 'update_menu'):
             try:
                 self.icon.update_menu()
             except Exception:
-                logging.debug("Не удалось обновить меню трея после переключения паузы")
+                logging.debug(log('menu_update_error'))
         # Обновляем tooltip
         self._update_tooltip()
 
+    def _notify_status(self, msg):
+        """Показывает статусное сообщение: без повторов и сохранения, в отличие от напоминаний"""
+        if self.outbox is not None:
+            self.outbox.submit_status(msg)
+        else:
+            self.notify(msg)
+
     def _pause_label(self, item):
         """Возвращает актуальный текст для пункта паузы"""
-        if self.lang == 'en':
-            return "Resume" if self.paused else "Pause"
-        return "Возобновить" if self.paused else "Пауза"
+        return tr('ui.menu_resume' if self.paused else 'ui.menu_pause')
     
     def check_now(self, icon=None, item=None):
         """Показывает уведомление немедленно"""
-        msg = random.choice(self.messages) if self.mode == 'random' else self.messages[self.idx % len(self.messages)]
-        self.idx += 1
+        msg = self._next_message()
         logging.info(log('manual_check'))
+        self._checkpoint()
+        self._record(EVENT_MANUAL)
         self.notify(msg)
     
     def quit_app(self, icon=None, item=None):
         """Выход из приложения"""
         logging.info(log('quitting'))
+        self._record(EVENT_QUIT)
         self.running = False
         self.icon.stop()
 
@@ -170,11 +416,12 @@ class TrayManager:
         with self._lock:
             self.interval_minutes = minutes
             self._seconds_left = minutes * 60
+        self._record(EVENT_INTERVAL, minutes)
+        self._checkpoint()
         # Сохраняем в config.ini
         save_interval(minutes)
         # Уведомляем пользователя
-        msg = (f"Interval set to {minutes} min" if self.lang == 'en' else f"Интервал установлен: {minutes} мин")
-        self.notify(msg)
+        self._notify_status(tr('ui.interval_set', minutes=minutes))
         # Обновляем tooltip
         self._update_tooltip()
     
@@ -183,6 +430,17 @@ class TrayManager:
         logging.debug(log('shutdown_start'))
         if self.running:
             self.running = False
+            self._record(EVENT_QUIT)
+        self._wake.set()
+        self._checkpoint()
+        if self.activity is not None:
+            self.activity.stop()
+        if self.memory_reporter is not None:
+            self.memory_reporter.stop()
+        if self.sync is not None:
+            self.sync.stop()
+        if self.outbox is not None:
+            self.outbox.stop()
         try:
             if hasattr(self, 'icon') and self.icon is not None:
                 self.icon.stop()
@@ -190,52 +448,110 @@ class TrayManager:
         except Exception as e:
             # Игнорируем ошибки остановки иконки (например, если уже остановлена)
             logging.debug(log('shutdown_tray_error', error=e))
+        if self.history is not None:
+            self.history.close()
     
-    def run(self):
-        """Запускает трей в отдельном потоке"""
-        self.icon.run()
+    def run(self, on_ready=None):
+        """
+        Запускает цикл трея (блокирующий вызов)
+
+        Args:
+            on_ready: Вызывается (в отдельном потоке pystray), когда иконка показана
+        """
+        def setup(icon):
+            icon.visible = True
+            if on_ready is not None:
+                on_ready()
+        self.icon.run(setup=setup)
     
-    def start_timer_thread(self, interval):
-        """Запускает основной таймер в отдельном потоке с динамическим интервалом"""
+    def prepare_timer(self, interval):
+        """Задает интервал и восстанавливает текущий цикл перед первым тиком"""
+        seconds_left = self._restore_seconds_left(interval)
         with self._lock:
             self.interval_minutes = interval
-            self._seconds_left = interval * 60
+            self._seconds_left = seconds_left
         # Инициализируем tooltip
         self._update_tooltip()
+        if self.activity is not None and self.idle_pause_minutes:
+            self.activity.start()
+        if self.sync is not None:
+            self.sync.start()
 
-        def timer_loop():
-            logging.info(log('timer_started', interval=self.interval_minutes))
-            while self.running:
-                # Тик раз в секунду, учитывая возможное изменение интервала
-                time.sleep(1)
-                
-                with self._lock:
-                    if self._seconds_left is None:
-                        self._seconds_left = self.interval_minutes * 60
-                    elif not self.paused:
-                        self._seconds_left = max(0, self._seconds_left - 1)
+    def tick(self):
+        """Один секундный шаг отсчета: расписание, простой, календарь и срабатывание"""
+        self._tick()
+        # Счетчик растет только после завершенного шага: шаг, зависший на _lock
+        # или в notifier'е, не выглядит для watchdog как прогресс
+        self.ticks += 1
 
-                    seconds_left = self._seconds_left
-                    current_interval = self.interval_minutes
+    def _tick(self):
+        if self._wait_for_schedule():
+            return
+        idle = self._check_idle()
+
+        with self._lock:
+            if self._seconds_left is None:
+                self._seconds_left = self.interval_minutes * 60
+            elif not self.paused and not idle:
+                self._seconds_left = max(0, self._seconds_left - 1)
 
-                # Обновляем tooltip каждую секунду
-                self._update_tooltip()
+            seconds_left = self._seconds_left
+            current_interval = self.interval_minutes
 
-                if self.paused:
-                    continue
+        # Обновляем tooltip каждую секунду
+        self._update_tooltip()
 
-                if seconds_left % 60 == 0:
-                    logging.debug(log('timer_waiting', interval=current_interval))
+        if self.paused or idle:
+            return
 
-                if seconds_left == 0 and self.running and not self.paused:
-                    msg = random.choice(self.messages) if self.mode == 'random' else self.messages[self.idx % len(self.messages)]
-                    self.idx += 1
-                    logging.info(log('auto_notification', num=self.idx, msg=msg[:50]))
-                    self.notify(msg)
-                    with self._lock:
-                        self._seconds_left = self.interval_minutes * 60
-                    # Обновляем tooltip после сброса таймера
-                    self._update_tooltip()
+        if seconds_left % 60 == 0:
+            logging.debug(log('timer_waiting', interval=current_interval))
+
+        if seconds_left == 0 and self.calendar is not None:
+            busy_until = self.calendar.busy_until()
+            if busy_until is not None:
+                delay = max(1, int(busy_until - time.time()) + 1)
+                with self._lock:
+                    self._seconds_left = delay
+                logging.info(log('calendar_deferred', seconds=delay))
+                self._checkpoint()
+                return
+
+        if seconds_left == 0 and self.sync is not None and not self.sync.is_leader():
+            # Напоминание покажет ведущая машина и пришлет новый срок; если она пропала,
+            # через PEER_TIMEOUT ведущей станет эта машина
+            with self._lock:
+                self._seconds_left = SYNC_FOLLOWER_RECHECK
+            logging.debug(log('sync_follower_wait', seconds=SYNC_FOLLOWER_RECHECK))
+            return
+
+        if seconds_left == 0 and self.running and not self.paused:
+            msg = self._next_message()
+            logging.info(log('auto_notification', num=self.idx, msg=msg[:50]))
+            self._record(EVENT_AUTO, current_interval)
+            self._last_fire = time.time()
+            today = datetime.date.today()
+            if self.breaks_day != today:
+                self.breaks_day = today
+                self.breaks_today = 0
+            self.breaks_today += 1
+            self.notify(msg)
+            with self._lock:
+                self._seconds_left = self.interval_minutes * 60
+            self._checkpoint()
+            # Обновляем tooltip после сброса таймера
+            self._update_tooltip()
+
+    def start_timer_thread(self, interval):
+        """Запускает основной таймер в отдельном потоке с динамическим интервалом"""
+        self.prepare_timer(interval)
+
+        def timer_loop():
+            logging.info(log('timer_started', interval=self.interval_minutes))
+            while self.running:
+                # Тик раз в секунду, учитывая возможное изменение интервала
+                time.sleep(1)
+                self.tick()
 
         timer_thread = threading.Thread(target=timer_loop, daemon=True)
         timer_thread.start()
@@ -247,12 +563,35 @@ def main():
     # Парсинг аргументов командной строки
     args = parse_args()
     
-    # Определяем язык до настройки логирования
-    lang = get_language(lang_override=args.lang)
-    # Устанавливаем язык для всех модулей логирования
-    set_log_language(lang)
-    set_config_log_language(lang)
-    set_notifier_log_language(lang)
+    # Определяем язык до настройки логирования и загружаем его каталог сообщений
+    lang = set_language(get_language(lang_override=args.lang))
+    
+    # Отчет по журналу событий без запуска трея
+    if args.stats is not None:
+        history_file = load_history_file()
+        if history_file:
+            print(format_report(daily_stats(history_file, args.stats), args.stats))
+        return
+    
+    if args.calendar_bench:
+        run_calendar_benchmark(events=args.calendar_bench)
+        return
+    
+    if args.sync_test:
+        run_loopback_test(nodes=max(2, args.sync_test))
+        return
+    
+    if args.activity_test:
+        run_activity_selftest()
+        return
+    
+    if args.sd_notify_test:
+        run_sd_notify_selftest()
+        return
+    
+    if args.lean_bench:
+        run_lean_benchmark(lang)
+        return
     
     # Настройка логирования
     setup_logging(verbose=args.verbose)
@@ -264,20 +603,88 @@ def main():
     interval, messages, mode, lang = load_config(lang_override=args.lang)
     logging.info(log('config_loaded', lang=lang, interval=interval, mode=mode, count=len(messages)))
     
-    # Инициализация notifier'а
-    notify = init_notifier(lang=lang)
+    # Инициализация notifier'а; уведомления идут через очередь с повторной доставкой
+    notifier, fallback_notifier = select_notifier()
+    outbox = Outbox(notifier, fallback_notifier, path=load_outbox_file())
+    outbox.start()
+    
+    # Источник активности для авто-паузы при простое
+    idle_pause_minutes, idle_reset_minutes = load_idle_settings()
+    activity = init_activity_source() if idle_pause_minutes else None
+    
+    # Журнал событий
+    history_file = load_history_file()
+    history = None
+    if history_file:
+        try:
+            history = HistoryStore(history_file)
+        except (sqlite3.Error, OSError) as e:
+            # Журнал - необязательная функция: без него напоминания все равно работают
+            logging.error(log('history_open_error', path=history_file, error=e))
+    
+    # Сохраненное состояние таймера
+    state_file = load_state_file()
+    state = StateStore(state_file) if state_file else None
+    
+    # Календарь встреч
+    calendar_file = load_calendar_file()
+    calendar = CalendarIndex(calendar_file) if calendar_file else None
+    
+    # Рабочие и тихие часы
+    schedule = load_schedule()
+    
+    # Согласование с другими машинами пользователя
+    sync_settings = load_sync_settings()
+    sync = None
+    if sync_settings:
+        listen, peers, secret = sync_settings
+        try:
+            sync = PeerSync(listen, peers, secret=secret)
+        except OSError as e:
+            logging.error(log('sync_bind_error', address=f'{listen[0]}:{listen[1]}', error=e))
     
     # Создаем менеджер системного трея
     logging.info(log('init_tray'))
-    tray_manager = TrayManager(notify, messages, mode, lang)
+    tray_manager = TrayManager(outbox.submit, messages, mode, lang, activity=activity,
+                               idle_pause_minutes=idle_pause_minutes, idle_reset_minutes=idle_reset_minutes,
+                               history=history, state=state, calendar=calendar, schedule=schedule, sync=sync,
+                               lean=args.lean)
+    tray_manager.outbox = outbox
+    
+    if args.memory_report:
+        tray_manager.memory_reporter = MemoryReporter(args.memory_report, lean=args.lean)
+        if not args.lean:
+            tray_manager.memory_reporter.start()
     
     # Запускаем таймер в отдельном потоке
     timer_thread = tray_manager.start_timer_thread(interval)
     
+    # Готовность и watchdog для запуска как службы systemd
+    service = SystemdNotifier.from_environment()
+    if service.watchdog_interval:
+        # Даже вне рабочих часов тик должен завершаться чаще, чем проверяет watchdog
+        tray_manager.max_sleep = max(1, min(tray_manager.max_sleep, service.watchdog_interval / 4))
+
+    def service_status():
+        # Без _lock: поток watchdog не должен зависнуть вместе с таймером, которого он проверяет
+        seconds_left = tray_manager._seconds_left
+        return tr('systemd_notify.status_countdown', time=tray_manager._format_time_left(seconds_left))
+
+    def on_tray_ready():
+        # Экономный режим: иконка передана трею, все нужное только для запуска можно освободить
+        if args.lean:
+            apply_lean()
+            if tray_manager.memory_reporter is not None:
+                tray_manager.memory_reporter.start()
+        service.ready(service_status())
+        service.start_watchdog(lambda: tray_manager.ticks if timer_thread.is_alive() else STALLED, service_status)
+    
     # Единая функция очистки ресурсов и завершения
     def cleanup():
         logging.info(log('cleanup'))
+        service.stopping()
         tray_manager.shutdown()
+        service.stop()
 
     # Обработчики сигналов для корректного завершения (SIGINT/SIGTERM)
     def handle_termination(signum, frame):
@@ -302,7 +709,7 @@ def main():
             logging.debug(log('signal_error', signal='SIGTERM', error=e))
         
         logging.info(log('tray_starting'))
-        tray_manager.run()
+        tray_manager.run(on_ready=on_tray_ready)
     except KeyboardInterrupt:
         logging.info(log('keyboard_interrupt'))
     except Exception as e:
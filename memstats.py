@@ -0,0 +1,130 @@
+"""Периодический отчет о потреблении памяти"""
+import gc
+import os
+import subprocess
+import sys
+import threading
+import logging
+from typing import Dict, Optional
+
+from i18n import prune_catalog, translator
+
+_log = translator('memstats')
+
+# Строки, которые нужны только режимам, завершающимся до запуска трея
+# (демон, прогон soak, самопроверки и отчет --stats)
+LEAN_CATALOG_SECTIONS = ('daemon', 'soak', 'notifiers.session')
+LEAN_CATALOG_PREFIXES = ('test_', 'bench_', 'report_')
+
+def rss_bytes() -> Optional[int]:
+    """
+    Возвращает текущий RSS процесса в байтах
+
+    Returns:
+        RSS или None, если платформа не позволяет его узнать
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Пиковое значение: ru_maxrss в КиБ на Linux и в байтах на macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+def _format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return '?'
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+def apply_lean() -> Dict[str, Optional[int]]:
+    """
+    Освобождает то, что нужно только при запуске (экономный режим)
+
+    Вызывается после передачи иконки трею: удаляет из каталога строки
+    самопроверок и демона и собирает мусор. Основная экономия - иконка без
+    ImageDraw (см. main.create_tray_icon), ее сравнивает run_lean_benchmark.
+
+    Returns:
+        Словарь с RSS и числом объектов gc до и после и числом удаленных строк
+    """
+    before_rss, before_objects = rss_bytes(), len(gc.get_objects())
+    strings = prune_catalog(LEAN_CATALOG_SECTIONS, LEAN_CATALOG_PREFIXES)
+    gc.collect()
+    result = {'rss_before': before_rss, 'objects_before': before_objects,
+              'rss': rss_bytes(), 'objects': len(gc.get_objects()), 'strings': strings}
+    logging.info(_log('lean_applied', strings=strings, rss_before=_format_bytes(before_rss),
+                      rss=_format_bytes(result['rss']), objects_before=before_objects,
+                      objects=result['objects']))
+    return result
+
+def _measure_startup(lean: bool) -> None:
+    """Дочерний процесс бенчмарка: готовит иконку и каталог как main и печатает RSS и число объектов"""
+    import main
+    icon = main.create_tray_icon(lean)
+    if lean:
+        apply_lean()
+    gc.collect()
+    print(rss_bytes() or 0, len(gc.get_objects()))
+    del icon
+
+def run_lean_benchmark(lang: str) -> Dict[str, Dict[str, int]]:
+    """
+    Сравнивает обычный и экономный режимы в отдельных процессах
+
+    Каждый режим запускается в чистом интерпретаторе (иначе уже загруженные
+    модули не дали бы увидеть разницу): импорт main, язык, иконка трея и
+    очистка экономного режима.
+
+    Args:
+        lang: Язык каталога, как при обычном запуске
+
+    Returns:
+        Словарь режим -> {'rss': байты, 'objects': число объектов gc}
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for lean in (False, True):
+        code = f'import i18n, memstats; i18n.set_language({lang!r}); memstats._measure_startup({lean!r})'
+        output = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.split()
+        mode = 'lean' if lean else 'default'
+        results[mode] = {'rss': int(output[0]), 'objects': int(output[1])}
+        print(_log('bench_mode', mode=_log('mode_' + mode), rss=_format_bytes(results[mode]['rss']),
+                   objects=results[mode]['objects']))
+    print(_log('bench_saved', rss=_format_bytes(results['default']['rss'] - results['lean']['rss']),
+               objects=results['default']['objects'] - results['lean']['objects']))
+    return results
+
+class MemoryReporter:
+    """Фоновый поток, периодически логирующий RSS и число объектов gc"""
+
+    def __init__(self, interval_minutes: float, lean: bool = False):
+        self.interval = interval_minutes * 60
+        self.lean = lean
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def report(self) -> None:
+        """Логирует текущее потребление памяти"""
+        mode = _log('mode_lean' if self.lean else 'mode_default')
+        logging.info(_log('memory_report', mode=mode, rss=_format_bytes(rss_bytes()),
+                          objects=len(gc.get_objects())))
+
+    def start(self) -> None:
+        """Запускает поток отчетов (первый отчет - сразу)"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает поток отчетов"""
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        self.report()
+        while not self._stop_event.wait(self.interval):
+            self.report()
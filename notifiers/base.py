@@ -3,13 +3,22 @@ from abc import ABC, abstractmethod
 
 class BaseNotifier(ABC):
     """Базовый класс для всех notifier'ов"""
+
+    __slots__ = ()
     
     @abstractmethod
-    def notify(self, msg: str) -> None:
+    def notify(self, msg: str) -> bool:
         """
         Отправляет уведомление
         
         Args:
             msg: Текст уведомления
+
+        Returns:
+            True, если уведомление передано системе
         """
         pass
+
+    def is_available(self) -> bool:
+        """Проверяет, может ли notifier сейчас доставить уведомление (дешевая проверка без отправки)"""
+        return True
@@ -1,38 +1,34 @@
 """Fallback notifier для консольного вывода"""
+import sys
 import logging
-from typing import Callable
 
+from i18n import translator
 from .base import BaseNotifier
 
-LOG_MESSAGES = {
-    'ru': {
-        'notification_console': 'Вывод в консоль (fallback): {msg}',
-    },
-    'en': {
-        'notification_console': 'Console output (fallback): {msg}',
-    }
-}
-
-_log_lang = 'en'
-
-def set_log_language(lang: str):
-    """Устанавливает язык для логирования"""
-    global _log_lang
-    _log_lang = lang if lang in LOG_MESSAGES else 'en'
-
-def _log(key: str, **kwargs) -> str:
-    """Возвращает локализованное сообщение для логирования"""
-    return LOG_MESSAGES[_log_lang].get(key, LOG_MESSAGES['en'].get(key, key)).format(**kwargs)
+_log = translator('notifiers.console')
 
 class ConsoleNotifier(BaseNotifier):
     """Fallback notifier для консольного вывода"""
+
+    def is_available(self) -> bool:
+        """Проверяет, есть ли куда выводить (под pythonw stdout отсутствует)"""
+        return sys.stdout is not None
     
-    def notify(self, msg: str) -> None:
+    def notify(self, msg: str) -> bool:
         """
         Выводит уведомление в консоль
         
         Args:
             msg: Текст уведомления
+
+        Returns:
+            True, если вывод удался
         """
-        print(f"[EyeCare] {msg}")
+        if not self.is_available():
+            return False
+        try:
+            print(f"[EyeCare] {msg}", flush=True)
+        except OSError:
+            return False
         logging.debug(_log('notification_console', msg=msg))
+        return True
@@ -0,0 +1,137 @@
+"""Notifier'ы для чужих пользовательских сессий (режим демона)"""
+import os
+import subprocess
+import sys
+import logging
+
+from i18n import translator
+from .base import BaseNotifier
+
+NOTIFICATION_TIMEOUT = 5  # Таймаут для notify-send в секундах
+
+_log = translator('notifiers.session')
+
+def session_bus_path(uid: int) -> str:
+    """Возвращает путь к сокету сессионной шины пользователя"""
+    return f"/run/user/{uid}/bus"
+
+class DBusSessionNotifier(BaseNotifier):
+    """Notifier, отправляющий notify-send в сессионную шину указанного пользователя"""
+
+    __slots__ = ('uid', 'gid', 'address')
+
+    def __init__(self, uid: int, gid: int, address: str = None):
+        self.uid = uid
+        self.gid = gid
+        self.address = address or f"unix:path={session_bus_path(uid)}"
+
+    def _drop_privileges(self):
+        # Выполняется в дочернем процессе (только Python < 3.9): сбрасываем группы root
+        os.setgroups([])
+        os.setgid(self.gid)
+        os.setuid(self.uid)
+
+    def _credentials(self) -> dict:
+        """Возвращает аргументы subprocess.run для запуска от имени пользователя"""
+        if os.geteuid() != 0 or self.uid == 0:
+            return {}
+        if sys.version_info >= (3, 9):
+            # Без preexec_fn: он небезопасен в многопоточном процессе (пул доставки демона)
+            return {'user': self.uid, 'group': self.gid, 'extra_groups': []}
+        return {'preexec_fn': self._drop_privileges}
+
+    def is_available(self) -> bool:
+        """Проверяет наличие сокета сессионной шины пользователя"""
+        return os.path.exists(session_bus_path(self.uid))
+
+    def notify(self, msg: str) -> bool:
+        """
+        Отправляет уведомление в D-Bus сессию пользователя
+
+        Args:
+            msg: Текст уведомления
+
+        Returns:
+            True, если notify-send завершился успешно
+        """
+        env = {'DBUS_SESSION_BUS_ADDRESS': self.address, 'PATH': os.environ.get('PATH', '/usr/bin:/bin')}
+        try:
+            subprocess.run(["notify-send", "EyeCare", str(msg)], check=True, env=env,
+                           timeout=NOTIFICATION_TIMEOUT, **self._credentials())
+            return True
+        except (subprocess.SubprocessError, OSError) as e:
+            logging.error(_log('session_dbus_error', uid=self.uid, error=e))
+            return False
+
+class TTYNotifier(BaseNotifier):
+    """Notifier, выводящий сообщение во все терминалы /dev/pts пользователя"""
+
+    __slots__ = ('uid', 'pts_dir')
+
+    def __init__(self, uid: int, pts_dir: str = '/dev/pts'):
+        self.uid = uid
+        self.pts_dir = pts_dir
+
+    def notify(self, msg: str) -> bool:
+        """
+        Пишет уведомление в терминалы пользователя
+
+        Args:
+            msg: Текст уведомления
+
+        Returns:
+            True, если сообщение попало хотя бы в один терминал
+        """
+        delivered = False
+        try:
+            entries = os.listdir(self.pts_dir)
+        except OSError:
+            entries = []
+        for name in entries:
+            if not name.isdigit():
+                continue
+            tty = os.path.join(self.pts_dir, name)
+            try:
+                if os.stat(tty).st_uid != self.uid:
+                    continue
+                fd = os.open(tty, os.O_WRONLY | os.O_NOCTTY | os.O_NONBLOCK)
+                try:
+                    os.write(fd, f"\r\n[EyeCare] {msg}\r\n".encode('utf-8'))
+                finally:
+                    os.close(fd)
+                delivered = True
+            except OSError as e:
+                logging.debug(_log('session_tty_error', tty=tty, error=e))
+        if not delivered:
+            logging.debug(_log('session_no_tty', uid=self.uid))
+        return delivered
+
+class AutoSessionNotifier(BaseNotifier):
+    """
+    Notifier, выбирающий D-Bus или терминалы при каждой доставке
+
+    Пользователь может войти в графическую сессию или выйти из нее уже после
+    запуска демона, поэтому наличие сессионной шины проверяется перед каждым
+    уведомлением; если шины нет или notify-send не сработал, сообщение уходит
+    в терминалы.
+    """
+
+    __slots__ = ('dbus', 'tty')
+
+    def __init__(self, uid: int, gid: int):
+        self.dbus = DBusSessionNotifier(uid, gid)
+        self.tty = TTYNotifier(uid)
+
+    def notify(self, msg: str) -> bool:
+        """
+        Отправляет уведомление в D-Bus сессию, а при неудаче - в терминалы
+
+        Args:
+            msg: Текст уведомления
+
+        Returns:
+            True, если уведомление доставлено хотя бы одним способом
+        """
+        if self.dbus.is_available() and self.dbus.notify(msg):
+            return True
+        return self.tty.notify(msg)
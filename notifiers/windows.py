@@ -1,38 +1,12 @@
 """Notifier для Windows используя win11toast или win10toast"""
 import logging
-from typing import Callable, Optional
 
+from i18n import translator
 from .base import BaseNotifier
 
-LOG_MESSAGES = {
-    'ru': {
-        'notification_sending_win11': 'Отправка уведомления через win11toast: {msg}...',
-        'notification_sending_win10': 'Отправка уведомления через win10toast: {msg}...',
-        'notification_sent': 'Уведомление успешно отправлено',
-        'notify_error_win11': 'Ошибка при отправке уведомления через win11toast: {error}',
-        'notify_error_win10': 'Ошибка при отправке уведомления через win10toast: {error}',
-    },
-    'en': {
-        'notification_sending_win11': 'Sending notification via win11toast: {msg}...',
-        'notification_sending_win10': 'Sending notification via win10toast: {msg}...',
-        'notification_sent': 'Notification sent successfully',
-        'notify_error_win11': 'Error sending notification via win11toast: {error}',
-        'notify_error_win10': 'Error sending notification via win10toast: {error}',
-    }
-}
-
 NOTIFICATION_TIMEOUT = 5  # Таймаут для отправки уведомлений в секундах
 
-_log_lang = 'en'
-
-def set_log_language(lang: str):
-    """Устанавливает язык для логирования"""
-    global _log_lang
-    _log_lang = lang if lang in LOG_MESSAGES else 'en'
-
-def _log(key: str, **kwargs) -> str:
-    """Возвращает локализованное сообщение для логирования"""
-    return LOG_MESSAGES[_log_lang].get(key, LOG_MESSAGES['en'].get(key, key)).format(**kwargs)
+_log = translator('notifiers.windows')
 
 class WindowsNotifier(BaseNotifier):
     """Notifier для Windows используя win11toast или win10toast"""
@@ -68,21 +42,25 @@ class WindowsNotifier(BaseNotifier):
         """Проверяет, используется ли win11toast"""
         return self._is_win11
     
-    def notify(self, msg: str) -> None:
+    def notify(self, msg: str) -> bool:
         """
         Отправляет уведомление через win11toast или win10toast
         
         Args:
             msg: Текст уведомления
+
+        Returns:
+            True, если уведомление показано
         """
         if not self._available:
-            return
+            return False
         
         if self._is_win11 and self._win11toast:
             logging.debug(_log('notification_sending_win11', msg=msg[:50]))
             try:
                 self._win11toast("EyeCare", msg)
                 logging.debug(_log('notification_sent'))
+                return True
             except Exception as e:
                 logging.error(_log('notify_error_win11', error=e))
         elif self._toaster:
@@ -90,5 +68,7 @@ class WindowsNotifier(BaseNotifier):
             try:
                 self._toaster.show_toast("EyeCare", str(msg), duration=NOTIFICATION_TIMEOUT)
                 logging.debug(_log('notification_sent'))
+                return True
             except Exception as e:
                 logging.error(_log('notify_error_win10', error=e))
+        return False
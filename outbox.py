@@ -0,0 +1,263 @@
+"""Очередь исходящих уведомлений с повторной доставкой"""
+import json
+import os
+import random
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from i18n import translator
+from notifiers.base import BaseNotifier
+
+RETRY_BASE_SECONDS = 2.0  # Задержка перед первым повтором; дальше удваивается
+RETRY_MAX_SECONDS = 120.0  # Потолок задержки между повторами
+PROBE_TTL = 30.0  # Сколько секунд доверять результату проверки доступности notifier'а
+MAX_AGE_SECONDS = 300.0  # Напоминание старше этого уже неактуально
+STATUS_MAX_AGE_SECONDS = 10.0  # Статусное сообщение ("Пауза", "Интервал ...") позже показывать незачем
+MAX_PENDING = 32  # Ограничение очереди: лишние (самые старые) отбрасываются
+
+# Итоги доставки
+OUTCOME_DELIVERED = 'delivered'
+OUTCOME_RETRIED = 'retried'  # Доставлено, но не с первой попытки
+OUTCOME_FALLBACK = 'fallback'  # Основной notifier так и не ответил, показано резервным
+OUTCOME_EXPIRED = 'expired'
+OUTCOME_DROPPED = 'dropped'
+
+_FILE_VERSION = 1
+
+_log = translator('outbox')
+
+class _Entry:
+    """Ожидающее доставки уведомление"""
+
+    __slots__ = ('msg', 'created', 'attempts', 'next_try', 'transient')
+
+    def __init__(self, msg: str, created: float, attempts: int = 0, transient: bool = False):
+        self.msg = msg
+        self.created = created
+        self.attempts = attempts
+        self.next_try = created
+        # Статусное сообщение: одна попытка, в файл очереди не попадает
+        self.transient = transient
+
+class Outbox:
+    """
+    Очередь между TrayManager и notifier'ом
+
+    submit() лишь записывает уведомление (в память и, если задан path, в файл)
+    и будит поток доставки, так что таймер не ждет notify-send. Неудачная
+    попытка повторяется с экспоненциальной задержкой и случайным разбросом.
+    Доступность notifier'а проверяется дешевым is_available() не чаще раза в
+    PROBE_TTL секунд: пока бэкенд недоступен, попыток отправки нет. Напоминание
+    старше max_age не показывается основным notifier'ом: оно уходит в резервный
+    (если есть) или считается просроченным. Ожидающие уведомления переживают
+    перезапуск через файл очереди. Статусные сообщения (submit_status)
+    показываются одной попыткой без повторов и не сохраняются.
+    """
+
+    def __init__(self, notifier: BaseNotifier, fallback: Optional[BaseNotifier] = None,
+                 path: Optional[str] = None, max_age: float = MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.time, rng: Optional[random.Random] = None):
+        self.notifier = notifier
+        self.fallback = fallback
+        self.path = path
+        self.max_age = max_age
+        self.outcomes: Dict[str, int] = {name: 0 for name in (
+            OUTCOME_DELIVERED, OUTCOME_RETRIED, OUTCOME_FALLBACK, OUTCOME_EXPIRED, OUTCOME_DROPPED)}
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._pending: List[_Entry] = []
+        self._probe: Tuple[float, Optional[bool]] = (float('-inf'), None)  # (момент проверки, результат)
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_saved = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # --- Файл очереди ---
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != _FILE_VERSION:
+                raise ValueError(data.get('version'))
+            entries = [_Entry(str(msg), float(created), int(attempts)) for msg, created, attempts in data['pending']]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(_log('outbox_invalid', path=self.path, error=e))
+            return
+        now = self._clock()
+        for entry in entries:
+            if now - entry.created > self.max_age:
+                self._report(entry, OUTCOME_EXPIRED, now)
+            else:
+                self._pending.append(entry)
+        if self._pending:
+            logging.info(_log('outbox_restored', count=len(self._pending)))
+        self._save()
+
+    def _save(self) -> None:
+        # Вызывается под self._lock или до запуска потока
+        if not self.path:
+            return
+        data = json.dumps({'version': _FILE_VERSION,
+                           'pending': [[e.msg, e.created, e.attempts] for e in self._pending if not e.transient]},
+                          ensure_ascii=False)
+        if data == self._last_saved:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_saved = data
+        except OSError as e:
+            logging.error(_log('outbox_save_error', error=e))
+
+    # --- Публичный интерфейс ---
+
+    def submit(self, msg: str) -> None:
+        """Ставит уведомление в очередь; первая попытка - сразу в потоке доставки"""
+        self._enqueue(_Entry(str(msg), self._clock()))
+
+    def submit_status(self, msg: str) -> None:
+        """
+        Показывает статусное сообщение без гарантии доставки
+
+        Попытка одна и в том же потоке доставки (таймер не ждет notify-send):
+        без повторов, резервного notifier'а и записи в файл очереди. Если за
+        STATUS_MAX_AGE_SECONDS показать не удалось, сообщение отбрасывается.
+        """
+        self._enqueue(_Entry(str(msg), self._clock(), transient=True))
+
+    def _enqueue(self, entry: _Entry) -> None:
+        now = entry.created
+        with self._lock:
+            self._pending.append(entry)
+            while len(self._pending) > MAX_PENDING:
+                self._report(self._pending.pop(0), OUTCOME_DROPPED, now)
+            self._save()
+        self._wake.set()
+
+    def start(self) -> None:
+        """Запускает поток доставки"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Останавливает поток; недоставленное остается в файле до следующего запуска"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logging.info(_log('outbox_summary', pending=len(self._pending), **self.outcomes))
+
+    # --- Доставка ---
+
+    def _backend_available(self, now: float) -> bool:
+        checked_at, available = self._probe
+        if now - checked_at < PROBE_TTL:
+            return available
+        was_available = available
+        available = self.notifier.is_available()
+        self._probe = (now, available)
+        if available != was_available:
+            logging.info(_log('outbox_backend_up' if available else 'outbox_backend_down',
+                              notifier=type(self.notifier).__name__))
+        return available
+
+    def _next_due(self, now: float) -> Tuple[Optional[_Entry], Optional[float]]:
+        with self._lock:
+            if not self._pending:
+                return None, None
+            due = [e for e in self._pending if e.next_try <= now]
+            if due:
+                # Из готовых к попытке - самое старое, чтобы сохранить порядок
+                return min(due, key=lambda e: e.created), None
+            return None, min(e.next_try for e in self._pending) - now
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            # Сбрасываем флаг до выбора записи, чтобы не потерять submit() между ними
+            self._wake.clear()
+            now = self._clock()
+            entry, timeout = self._next_due(now)
+            if entry is None:
+                self._wake.wait(timeout)
+                continue
+            self._attempt(entry, now)
+
+    def _attempt(self, entry: _Entry, now: float) -> None:
+        if entry.transient:
+            delivered = (now - entry.created <= STATUS_MAX_AGE_SECONDS and self._backend_available(now)
+                         and self.notifier.notify(entry.msg))
+            self._finish(entry, OUTCOME_DELIVERED if delivered else OUTCOME_DROPPED, now)
+            return
+
+        if now - entry.created > self.max_age:
+            delivered = (self.fallback is not None and self.fallback.is_available()
+                         and self.fallback.notify(entry.msg))
+            self._finish(entry, OUTCOME_FALLBACK if delivered else OUTCOME_EXPIRED, now)
+            return
+
+        if not self._backend_available(now):
+            # Бэкенд недоступен: не стучимся до следующей проверки
+            self._retry(entry, now, not_before=self._probe[0] + PROBE_TTL, quiet=True)
+            return
+
+        if self.notifier.notify(entry.msg):
+            self._finish(entry, OUTCOME_RETRIED if entry.attempts else OUTCOME_DELIVERED, now)
+        else:
+            # Проверка обманула (например, шина еще не готова): следующий раз проверяем заново
+            self._probe = (float('-inf'), True)
+            self._retry(entry, now)
+
+    def _retry(self, entry: _Entry, now: float, not_before: float = 0.0, quiet: bool = False) -> None:
+        entry.attempts += 1
+        delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1))
+        # Половина задержки фиксирована, половина случайна: экземпляры не повторяют в унисон
+        delay = delay / 2 + self._rng.uniform(0, delay / 2)
+        next_try = max(now + delay, not_before)
+        # Не ждем дольше срока жизни: по его истечении сработает резервный notifier
+        entry.next_try = min(next_try, entry.created + self.max_age + 0.001)
+        with self._lock:
+            self._save()
+        # О недоступном бэкенде уже сообщено при смене его состояния
+        (logging.debug if quiet else logging.info)(_log('outbox_retry', attempt=entry.attempts,
+                                                        seconds=entry.next_try - now))
+
+    def _finish(self, entry: _Entry, outcome: str, now: float) -> None:
+        with self._lock:
+            try:
+                self._pending.remove(entry)
+            except ValueError:
+                pass
+            self._save()
+        self._report(entry, outcome, now)
+
+    def _report(self, entry: _Entry, outcome: str, now: float) -> None:
+        self.outcomes[outcome] += 1
+        age = int(now - entry.created)
+        if outcome == OUTCOME_DELIVERED:
+            logging.debug(_log('outbox_delivered'))
+        elif entry.transient:
+            logging.debug(_log('outbox_status_dropped', msg=entry.msg[:50]))
+        elif outcome == OUTCOME_RETRIED:
+            logging.info(_log('outbox_delivered_late', attempts=entry.attempts + 1, seconds=age))
+        else:
+            logging.warning(_log(f'outbox_{outcome}', attempts=entry.attempts, seconds=age, msg=entry.msg[:50]))
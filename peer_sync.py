@@ -0,0 +1,465 @@
+"""Согласование таймера между машинами одного пользователя по UDP (LAN или loopback)"""
+import hashlib
+import hmac
+import random
+import socket
+import struct
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from i18n import translator
+
+DEFAULT_PORT = 47820
+HEARTBEAT_SECONDS = 10.0  # Единственный периодический трафик: heartbeat раз в столько секунд
+PEER_TIMEOUT_BEATS = 3  # Пир считается пропавшим после стольких пропущенных heartbeat
+DEADLINE_EPSILON = 2.0  # Расхождение срока (в секундах), которое не считается изменением
+STEADY_BEATS = 5  # За сколько heartbeat меряется трафик в --sync-test
+FRESHNESS_SECONDS = 60.0  # Сообщение с меткой времени дальше этого от наших часов отбрасывается
+
+# Типы сообщений
+MSG_HEARTBEAT = 1
+MSG_STATE = 2
+MSG_REQUEST = 3
+MSG_BYE = 4
+
+# Маска полей в сообщении MSG_STATE: передаются только изменившиеся поля
+FIELD_DEADLINE = 1
+FIELD_PAUSED = 2
+FIELD_INTERVAL = 4
+ALL_FIELDS = FIELD_DEADLINE | FIELD_PAUSED | FIELD_INTERVAL
+
+FLAG_IDLE = 1  # Флаг узла: пользователь за этой машиной отсутствует
+
+# Сообщение: заголовок, поля из маски по порядку, усеченный HMAC-SHA256 всего предыдущего
+_MAGIC = b'EY'
+_PROTOCOL = 2
+_HEADER = struct.Struct('<2sBBQQIBB')  # сигнатура, протокол, тип, узел, время отправки (мс), версия состояния, флаги, маска
+_FIELDS = (
+    (FIELD_DEADLINE, struct.Struct('<d')),
+    (FIELD_PAUSED, struct.Struct('<B')),
+    (FIELD_INTERVAL, struct.Struct('<H')),
+)
+TAG_SIZE = 8
+MAX_MESSAGE = _HEADER.size + sum(field.size for _, field in _FIELDS) + TAG_SIZE
+
+Address = Tuple[str, int]
+
+_log = translator('peer_sync')
+
+class SharedState(NamedTuple):
+    """Общее для всех машин состояние таймера"""
+    paused: bool
+    interval_minutes: int
+    deadline: float  # unix time следующего срабатывания
+
+class _Peer:
+    """Последнее, что известно о другой машине"""
+
+    __slots__ = ('address', 'last_seen', 'idle', 'version')
+
+    def __init__(self, address: Address):
+        self.address = address
+        self.last_seen = 0.0
+        self.idle = False
+        self.version = 0
+
+def parse_address(value: str, default_host: str = '0.0.0.0') -> Address:
+    """
+    Разбирает адрес вида "host:port", "host" или ":port"
+
+    Raises:
+        ValueError: если порт не число или вне диапазона
+    """
+    value = value.strip()
+    host, sep, port = value.rpartition(':')
+    if not sep:
+        host, port = value, str(DEFAULT_PORT)
+    port = int(port)
+    if not 0 <= port <= 65535:
+        raise ValueError(f'invalid port {port}')
+    return host or default_host, port
+
+class PeerSync:
+    """
+    Узел синхронизации таймера
+
+    Каждая машина хранит общее состояние (срок, пауза, интервал) с версией;
+    изменения рассылаются всем пирам одним сообщением MSG_STATE, в котором
+    есть только изменившиеся поля, и побеждает большая пара (версия, узел).
+    Периодически отправляется только heartbeat с версией: отставший узел
+    запрашивает полное состояние (MSG_REQUEST), так что потерянная дельта
+    восстанавливается без постоянного обмена. Напоминание показывает один
+    узел - с наименьшим id среди живых машин, где пользователь не отсутствует;
+    при исчезновении узла (MSG_BYE или PEER_TIMEOUT_BEATS пропущенных heartbeat)
+    роль переходит к следующему. Сообщения подписываются HMAC от общего секрета
+    (без секрета узел не создается) и несут время отправки: сообщение старше
+    FRESHNESS_SECONDS или не новее уже принятого от того же узла отбрасывается,
+    так что перехваченные пакеты нельзя воспроизвести.
+    """
+
+    def __init__(self, listen: Address, peers: List[Address], secret: str,
+                 heartbeat: float = HEARTBEAT_SECONDS, node_id: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if not secret:
+            raise ValueError('peer sync requires a shared secret')
+        self.node_id = node_id if node_id is not None else random.SystemRandom().getrandbits(63)
+        self.peers = list(peers)
+        self.heartbeat = heartbeat
+        self.on_state: Optional[Callable[[SharedState], None]] = None
+        self.bytes_sent = 0
+        self.beats_sent = 0
+        self._key = hashlib.sha256(b'eyecare-sync:' + secret.encode('utf-8')).digest()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state: Optional[SharedState] = None
+        self._version = 0
+        self._owner = 0
+        self._idle = False
+        self._seen: Dict[int, _Peer] = {}
+        self._last_sent: Dict[int, int] = {}  # узел -> время отправки последнего принятого сообщения (мс)
+        self._sent_ms = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self._sock.bind(listen)
+
+    @property
+    def address(self) -> Address:
+        """Фактический адрес сокета (полезно при привязке к порту 0)"""
+        return self._sock.getsockname()
+
+    @property
+    def state(self) -> Optional[SharedState]:
+        """Последнее известное общее состояние"""
+        return self._state
+
+    # --- Сообщения ---
+
+    def _timestamp(self) -> int:
+        # Строго возрастающая метка: два сообщения в одну миллисекунду не считаются повтором
+        self._sent_ms = max(self._sent_ms + 1, int(time.time() * 1000))
+        return self._sent_ms
+
+    def _pack(self, kind: int, mask: int = 0) -> bytes:
+        state = self._state
+        parts = [_HEADER.pack(_MAGIC, _PROTOCOL, kind, self.node_id, self._timestamp(), self._version,
+                              FLAG_IDLE if self._idle else 0, mask)]
+        if mask:
+            values = {FIELD_DEADLINE: state.deadline, FIELD_PAUSED: int(state.paused),
+                      FIELD_INTERVAL: state.interval_minutes}
+            for field, packer in _FIELDS:
+                if mask & field:
+                    parts.append(packer.pack(values[field]))
+        body = b''.join(parts)
+        return body + hmac.new(self._key, body, hashlib.sha256).digest()[:TAG_SIZE]
+
+    def _unpack(self, data: bytes):
+        if len(data) < _HEADER.size + TAG_SIZE:
+            return None
+        body, tag = data[:-TAG_SIZE], data[-TAG_SIZE:]
+        if not hmac.compare_digest(tag, hmac.new(self._key, body, hashlib.sha256).digest()[:TAG_SIZE]):
+            return None
+        magic, protocol, kind, node, sent, version, flags, mask = _HEADER.unpack_from(body)
+        if magic != _MAGIC or protocol != _PROTOCOL:
+            return None
+        if abs(time.time() * 1000 - sent) > FRESHNESS_SECONDS * 1000:
+            return None
+        fields = {}
+        offset = _HEADER.size
+        try:
+            for field, packer in _FIELDS:
+                if mask & field:
+                    fields[field] = packer.unpack_from(body, offset)[0]
+                    offset += packer.size
+        except struct.error:
+            return None
+        return kind, node, sent, version, flags, mask, fields
+
+    def _send(self, data: bytes, address: Address) -> None:
+        try:
+            self._sock.sendto(data, address)
+            self.bytes_sent += len(data)
+        except OSError as e:
+            logging.debug(_log('sync_send_error', address=f'{address[0]}:{address[1]}', error=e))
+
+    def _send_all(self, data: bytes) -> None:
+        for address in self.peers:
+            self._send(data, address)
+
+    # --- Публичный интерфейс ---
+
+    def publish(self, state: SharedState) -> None:
+        """Рассылает изменения общего состояния (только изменившиеся поля; без изменений - ничего)"""
+        with self._lock:
+            old = self._state
+            if old is None:
+                mask = ALL_FIELDS
+            else:
+                mask = 0
+                if abs(old.deadline - state.deadline) > DEADLINE_EPSILON:
+                    mask |= FIELD_DEADLINE
+                if old.paused != state.paused:
+                    mask |= FIELD_PAUSED
+                if old.interval_minutes != state.interval_minutes:
+                    mask |= FIELD_INTERVAL
+            if not mask:
+                return
+            self._state = state if mask & FIELD_DEADLINE else state._replace(deadline=old.deadline)
+            self._version += 1
+            self._owner = self.node_id
+            data = self._pack(MSG_STATE, mask)
+        self._send_all(data)
+
+    def set_idle(self, idle: bool) -> None:
+        """Сообщает пирам, что пользователь ушел от этой машины или вернулся"""
+        with self._lock:
+            if idle == self._idle:
+                return
+            self._idle = idle
+            data = self._pack(MSG_HEARTBEAT)
+        self._send_all(data)
+
+    def _alive(self, now: float) -> List[Tuple[int, bool]]:
+        timeout = self.heartbeat * PEER_TIMEOUT_BEATS
+        return [(node, peer.idle) for node, peer in self._seen.items() if now - peer.last_seen <= timeout]
+
+    def is_leader(self) -> bool:
+        """Проверяет, должна ли эта машина показывать напоминание"""
+        with self._lock:
+            alive = self._alive(self._clock()) + [(self.node_id, self._idle)]
+        candidates = [node for node, idle in alive if not idle] or [node for node, _ in alive]
+        return min(candidates) == self.node_id
+
+    def peer_active(self) -> bool:
+        """Проверяет, работает ли пользователь сейчас за другой машиной"""
+        with self._lock:
+            return any(not idle for _, idle in self._alive(self._clock()))
+
+    def peer_count(self) -> int:
+        """Возвращает число живых пиров"""
+        with self._lock:
+            return len(self._alive(self._clock()))
+
+    def start(self) -> None:
+        """Запускает поток приема и heartbeat"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logging.info(_log('sync_started', address='{}:{}'.format(*self.address), peers=len(self.peers),
+                          node=f'{self.node_id:016x}'))
+
+    def stop(self, farewell: bool = True) -> None:
+        """
+        Останавливает узел
+
+        Args:
+            farewell: Разослать MSG_BYE, чтобы пиры сразу выбрали нового ведущего
+        """
+        if self._thread is None:
+            self._sock.close()
+            return
+        self._stop_event.set()
+        if farewell:
+            with self._lock:
+                data = self._pack(MSG_BYE)
+            self._send_all(data)
+        # Будим recvfrom пустой датаграммой на собственный адрес
+        host, port = self.address
+        self._send(b'', ('127.0.0.1' if host == '0.0.0.0' else host, port))
+        self._thread.join(timeout=self.heartbeat)
+        self._thread = None
+        self._sock.close()
+
+    # --- Поток приема ---
+
+    def _run(self) -> None:
+        with self._lock:
+            hello = self._pack(MSG_HEARTBEAT)
+        self._send_all(hello)
+        next_beat = self._clock() + self.heartbeat
+        while not self._stop_event.is_set():
+            self._sock.settimeout(max(0.01, next_beat - self._clock()))
+            try:
+                data, address = self._sock.recvfrom(MAX_MESSAGE + 1)
+            except socket.timeout:
+                data = None
+            except OSError as e:
+                if self._stop_event.is_set():
+                    break
+                logging.debug(_log('sync_receive_error', error=e))
+                continue
+            if data:
+                self._handle(data, address)
+            if self._clock() >= next_beat:
+                next_beat = self._clock() + self.heartbeat
+                self._beat()
+
+    def _beat(self) -> None:
+        now = self._clock()
+        timeout = self.heartbeat * PEER_TIMEOUT_BEATS
+        with self._lock:
+            for node in [node for node, peer in self._seen.items() if now - peer.last_seen > timeout]:
+                del self._seen[node]
+                logging.info(_log('sync_peer_lost', node=f'{node:016x}'))
+            # Метки старше окна свежести не нужны: такие сообщения отбросит _unpack
+            horizon = time.time() * 1000 - FRESHNESS_SECONDS * 1000
+            for node in [node for node, sent in self._last_sent.items() if sent < horizon]:
+                del self._last_sent[node]
+            data = self._pack(MSG_HEARTBEAT)
+            self.beats_sent += 1
+        self._send_all(data)
+
+    def _handle(self, data: bytes, address: Address) -> None:
+        message = self._unpack(data)
+        if message is None:
+            logging.debug(_log('sync_bad_message', address=f'{address[0]}:{address[1]}'))
+            return
+        kind, node, sent, version, flags, mask, fields = message
+        if node == self.node_id:
+            return
+        replies = []
+        applied = None
+        with self._lock:
+            if sent <= self._last_sent.get(node, 0):
+                logging.debug(_log('sync_replayed_message', address=f'{address[0]}:{address[1]}'))
+                return
+            self._last_sent[node] = sent
+            if kind == MSG_BYE:
+                if self._seen.pop(node, None) is not None:
+                    logging.info(_log('sync_peer_left', node=f'{node:016x}'))
+                return
+            peer = self._seen.get(node)
+            if peer is None:
+                peer = self._seen[node] = _Peer(address)
+                logging.info(_log('sync_peer_joined', node=f'{node:016x}', address=f'{address[0]}:{address[1]}'))
+                # Новичку сразу сообщаем о себе, не дожидаясь очередного heartbeat
+                replies.append(self._pack(MSG_HEARTBEAT))
+            peer.address = address
+            peer.last_seen = self._clock()
+            peer.idle = bool(flags & FLAG_IDLE)
+            peer.version = version
+
+            if kind == MSG_STATE and (version, node) > (self._version, self._owner):
+                if self._state is None and mask != ALL_FIELDS:
+                    # Дельта без базы: нужна полная копия
+                    replies.append(self._pack(MSG_REQUEST))
+                else:
+                    if version > self._version + 1 and mask != ALL_FIELDS:
+                        # Пропустили промежуточные дельты: догоняем полной копией
+                        replies.append(self._pack(MSG_REQUEST))
+                    state = self._state or SharedState(False, 0, 0.0)
+                    self._state = SharedState(
+                        bool(fields[FIELD_PAUSED]) if mask & FIELD_PAUSED else state.paused,
+                        fields[FIELD_INTERVAL] if mask & FIELD_INTERVAL else state.interval_minutes,
+                        fields[FIELD_DEADLINE] if mask & FIELD_DEADLINE else state.deadline,
+                    )
+                    self._version, self._owner = version, node
+                    applied = self._state
+            elif kind == MSG_HEARTBEAT and version > self._version:
+                replies.append(self._pack(MSG_REQUEST))
+            elif kind == MSG_REQUEST and self._state is not None:
+                replies.append(self._pack(MSG_STATE, ALL_FIELDS))
+        for reply in replies:
+            self._send(reply, address)
+        if applied is not None and self.on_state is not None:
+            self.on_state(applied)
+
+def _wait_until(predicate: Callable[[], bool], timeout: float) -> Optional[float]:
+    """Ждет выполнения условия; возвращает затраченное время или None по таймауту"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if predicate():
+            return time.monotonic() - started
+        time.sleep(0.005)
+    return None
+
+def run_loopback_test(nodes: int = 3, heartbeat: float = 0.2) -> Dict[str, float]:
+    """
+    Проверка на loopback: nodes узлов на 127.0.0.1 с ускоренным heartbeat
+
+    Проверяет выбор единственного ведущего, схождение состояния после
+    дельты, смену ведущего при уходе пользователя, при MSG_BYE и при
+    "падении" узла без прощания (ушедший узел перед этим перезапускается,
+    так что проверка идет и для двух машин), и считает трафик в
+    установившемся режиме - за STEADY_BEATS heartbeat после обнаружения.
+
+    Returns:
+        Словарь с метриками; ok = 1.0, если все проверки прошли
+    """
+    if nodes < 2:
+        raise ValueError('loopback test needs at least 2 nodes')
+    secret = 'loopback'
+    syncs = [PeerSync(('127.0.0.1', 0), [], secret=secret, heartbeat=heartbeat) for _ in range(nodes)]
+    addresses = [sync.address for sync in syncs]
+    for sync in syncs:
+        sync.peers = [address for address in addresses if address != sync.address]
+    limit = heartbeat * (PEER_TIMEOUT_BEATS + 2)
+    checks = []
+    traffic = 0.0
+
+    def single_leader(group):
+        return sum(sync.is_leader() for sync in group) == 1
+
+    for sync in syncs:
+        sync.start()
+    try:
+        discovery = _wait_until(lambda: all(sync.peer_count() == nodes - 1 for sync in syncs), limit)
+        checks.append(('discovery', discovery))
+        checks.append(('single_leader', 0.0 if single_leader(syncs) else None))
+
+        # Дельта от ведомого узла доходит до всех
+        target = SharedState(True, 20, round(time.time()) + 1200)
+        follower = next(sync for sync in syncs if not sync.is_leader())
+        follower.publish(target)
+        checks.append(('convergence', _wait_until(lambda: all(sync.state == target for sync in syncs), limit)))
+
+        # Установившийся режим: только heartbeat; делим на фактическое число тактов узла,
+        # чтобы граница окна не давала лишний или недостающий такт
+        before = [(sync.bytes_sent, sync.beats_sent) for sync in syncs]
+        time.sleep(heartbeat * STEADY_BEATS)
+        traffic = sum((sync.bytes_sent - sent) / max(1, sync.beats_sent - beats)
+                      for sync, (sent, beats) in zip(syncs, before)) / nodes
+
+        # Пользователь ушел от ведущего: роль переходит к машине, где он есть
+        leader = next(sync for sync in syncs if sync.is_leader())
+        leader.set_idle(True)
+        checks.append(('idle_handover', _wait_until(lambda: not leader.is_leader() and single_leader(syncs), limit)))
+        leader.set_idle(False)
+        _wait_until(lambda: leader.is_leader(), limit)
+
+        # Ведущий завершился штатно (MSG_BYE)
+        index = syncs.index(leader)
+        others = [sync for sync in syncs if sync is not leader]
+        leader.stop()
+        checks.append(('bye_failover', _wait_until(lambda: single_leader(others), limit)))
+
+        # Тот же узел перезапускается на прежнем адресе и снова становится ведущим
+        leader = syncs[index] = PeerSync(addresses[index], leader.peers, secret=secret,
+                                         heartbeat=heartbeat, node_id=leader.node_id)
+        leader.start()
+        checks.append(('rejoin', _wait_until(lambda: leader.is_leader() and single_leader(syncs)
+                                             and leader.state == target, limit)))
+
+        # Ведущий пропал без прощания: ждем таймаута пира
+        leader.stop(farewell=False)
+        checks.append(('crash_failover', _wait_until(lambda: single_leader(others), limit * 2)))
+    finally:
+        for sync in syncs:
+            sync.stop()
+
+    result = {name: (-1.0 if value is None else value * 1000) for name, value in checks}
+    result['ok'] = 1.0 if all(value is not None for _, value in checks) else 0.0
+    result['bytes_per_node_heartbeat'] = traffic
+    result['bytes_per_node_second'] = traffic / heartbeat
+    print(_log('test_nodes', nodes=nodes, heartbeat=heartbeat))
+    for name, value in checks:
+        print(_log('test_check_ok' if value is not None else 'test_check_failed', check=name,
+                   ms=(value or 0) * 1000))
+    print(_log('test_traffic', per_beat=traffic, rate=traffic / HEARTBEAT_SECONDS,
+               heartbeat=HEARTBEAT_SECONDS, size=MAX_MESSAGE))
+    print(_log('test_passed' if result['ok'] else 'test_failed'))
+    return result
@@ -33,6 +33,7 @@ setup(
     entry_points={
         "console_scripts": [
             "eyecare=main:main",
+            "eyecare-daemon=daemon:main",
         ],
     },
 )
@@ -0,0 +1,237 @@
+"""Длительный прогон TrayManager без GUI для поиска утечек (FD, потоки, дочерние процессы, память)"""
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+from i18n import translator, set_language, get_language as active_language
+from cli import parse_args
+from config import get_language
+from activity import ManualActivitySource
+from history import HistoryStore
+from state import StateStore
+from templates import Template
+from memstats import rss_bytes, _format_bytes
+from notifiers import init_notifier
+from logging_config import setup_logging
+from main import TrayManager
+
+DEFAULT_TICKS = 300000  # Около 3.5 суток работы при тике в секунду
+SAMPLES = 50  # Сколько замеров делается за прогон
+WARMUP_FRACTION = 0.1  # Доля тиков до базового замера: кэши, пулы и потоки успевают создаться
+
+# Допустимый рост относительно базового замера
+FD_TOLERANCE = 0
+THREAD_TOLERANCE = 0
+CHILD_TOLERANCE = 0
+RSS_TOLERANCE = 8 * 1024 * 1024
+OBJECT_TOLERANCE = 2000
+
+# Сценарий: периоды в тиках (секундах)
+PAUSE_EVERY = 997  # Ручная пауза...
+PAUSE_LENGTH = 50  # ...на столько тиков
+INTERVAL_EVERY = 1511  # Смена интервала через меню
+CHECK_EVERY = 2003  # "Проверить сейчас"
+IDLE_EVERY = 4999  # Уход пользователя от компьютера...
+IDLE_LENGTHS = (200, 400)  # ...короче и длиннее idle_reset_minutes (по очереди)
+SOAK_INTERVALS = (1, 2, 3)  # Короткие интервалы, чтобы срабатываний было много
+
+_log = translator('soak')
+
+class Sample(NamedTuple):
+    """Замер ресурсов процесса"""
+    tick: int
+    fds: Optional[int]
+    threads: int
+    children: Optional[int]
+    rss: Optional[int]
+    objects: int
+
+def open_fds() -> Optional[int]:
+    """Возвращает число открытых дескрипторов процесса или None, если платформа не позволяет узнать"""
+    for path in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+def child_processes() -> Optional[int]:
+    """Возвращает число дочерних процессов (включая незавершенные зомби) или None вне Linux"""
+    pid = str(os.getpid())
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    count = 0
+    for name in entries:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                # Поле comm в скобках может содержать пробелы: ppid - второе поле после него
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        if len(fields) > 1 and fields[1] == pid:
+            count += 1
+    return count
+
+def take_sample(tick: int) -> Sample:
+    """Снимает замер после полной сборки мусора"""
+    gc.collect()
+    return Sample(tick, open_fds(), threading.active_count(), child_processes(), rss_bytes(), len(gc.get_objects()))
+
+class StubIcon:
+    """
+    Заглушка pystray.Icon без GUI
+
+    update_menu() заново вычисляет тексты и флаги всех пунктов меню, как это
+    делает pystray при перерисовке, так что утечки в обработчиках меню видны.
+    """
+
+    __slots__ = ('name', 'icon', 'title', 'menu', 'updates', 'visible')
+
+    def __init__(self, name, icon, title, menu):
+        self.name = name
+        self.icon = icon
+        self.title = title
+        self.menu = menu
+        self.updates = 0
+        self.visible = False
+
+    def _walk(self, menu) -> None:
+        for item in menu.items:
+            _ = (item.text, item.checked)
+            if item.submenu is not None:
+                self._walk(item.submenu)
+
+    def update_menu(self) -> None:
+        self.updates += 1
+        self._walk(self.menu)
+
+    def run(self, setup=None) -> None:
+        if setup is not None:
+            setup(self)
+
+    def stop(self) -> None:
+        pass
+
+def _check(baseline: Sample, final: Sample) -> List[str]:
+    """Возвращает описания метрик, выросших сверх допустимого"""
+    limits = (
+        ('fds', FD_TOLERANCE, str),
+        ('threads', THREAD_TOLERANCE, str),
+        ('children', CHILD_TOLERANCE, str),
+        ('rss', RSS_TOLERANCE, _format_bytes),
+        ('objects', OBJECT_TOLERANCE, str),
+    )
+    failures = []
+    for name, tolerance, fmt in limits:
+        before, after = getattr(baseline, name), getattr(final, name)
+        if before is None or after is None:
+            continue
+        if after - before > tolerance:
+            failures.append(_log('soak_metric_failed', metric=name, before=fmt(before), after=fmt(after),
+                                 tolerance=fmt(tolerance)))
+    return failures
+
+def run_soak(ticks: int = DEFAULT_TICKS, notify: Optional[Callable[[str], None]] = None,
+             seed: int = 42) -> bool:
+    """
+    Прогоняет TrayManager через ticks секундных тиков без сна и GUI
+
+    Время ускорено: tick() вызывается подряд, часы источника активности
+    сдвигаются на секунду за тик. Сценарий включает автоматические и ручные
+    напоминания, паузы, смену интервала (с записью config.ini), простой с
+    авто-паузой и сбросом цикла, журнал событий и файл состояния. Все файлы
+    создаются во временном каталоге, который на время прогона становится
+    текущим.
+
+    Args:
+        ticks: Число тиков (секунд работы)
+        notify: Функция уведомлений; по умолчанию уведомления только подсчитываются
+        seed: Зерно генератора для воспроизводимого сценария
+
+    Returns:
+        True, если ни одна метрика не выросла сверх допустимого
+    """
+    rng = random.Random(seed)
+    delivered = [0]
+
+    def count_notify(msg):
+        delivered[0] += 1
+        if notify is not None:
+            notify(msg)
+
+    workdir = tempfile.mkdtemp(prefix='eyecare-soak-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    clock = [0.0]
+    activity = ManualActivitySource(clock=lambda: clock[0])
+    history = HistoryStore(os.path.join(workdir, 'history.db'))
+    state = StateStore(os.path.join(workdir, 'state.bin'))
+    messages = [Template('Look away for 20 seconds'), Template('{breaks_today} breaks, {work_minutes} min at work')]
+    tray = TrayManager(count_notify, messages, 'sequential', active_language(), activity=activity,
+                       idle_pause_minutes=2, idle_reset_minutes=5, history=history, state=state,
+                       icon_factory=StubIcon)
+    samples = []
+    try:
+        tray.prepare_timer(SOAK_INTERVALS[0])
+        warmup = int(ticks * WARMUP_FRACTION)
+        sample_every = max(1, (ticks - warmup) // SAMPLES)
+        idle_left = 0
+        idle_round = 0
+        print(_log('soak_start', ticks=ticks, workdir=workdir))
+        for t in range(1, ticks + 1):
+            clock[0] += 1
+            if t % IDLE_EVERY == 0:
+                idle_left = IDLE_LENGTHS[idle_round % len(IDLE_LENGTHS)]
+                idle_round += 1
+            if idle_left:
+                idle_left -= 1
+            else:
+                activity.mark_activity()
+            if t % PAUSE_EVERY == 0 or (tray.paused and t % PAUSE_EVERY == PAUSE_LENGTH):
+                tray.toggle_pause()
+            if t % INTERVAL_EVERY == 0:
+                tray.set_interval(rng.choice(SOAK_INTERVALS))
+            if t % CHECK_EVERY == 0:
+                tray.check_now()
+            tray.tick()
+            if t == warmup or (t > warmup and (t - warmup) % sample_every == 0):
+                sample = take_sample(t)
+                samples.append(sample)
+                print(_log('soak_sample', tick=t, fds=sample.fds, threads=sample.threads,
+                           children=sample.children, rss=_format_bytes(sample.rss), objects=sample.objects))
+    finally:
+        tray.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failures = _check(samples[0], samples[-1]) if len(samples) > 1 else []
+    print(_log('soak_summary', ticks=ticks, notifications=delivered[0],
+               menu_updates=tray.icon.updates))
+    for failure in failures:
+        print(failure)
+    print(_log('soak_failed' if failures else 'soak_passed'))
+    return not failures
+
+def main():
+    """Точка входа прогона"""
+    args = parse_args()
+    set_language(get_language(lang_override=args.lang))
+    setup_logging(verbose=args.verbose)
+    if not args.verbose:
+        # Сотни тысяч тиков: в логе оставляем только предупреждения и ошибки
+        logging.getLogger().setLevel(logging.WARNING)
+    notify = init_notifier() if args.soak_notifier == 'platform' else None
+    sys.exit(0 if run_soak(ticks=args.soak_ticks, notify=notify) else 1)
+
+if __name__ == "__main__":
+    main()
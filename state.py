@@ -0,0 +1,83 @@
+"""Сохранение состояния таймера между перезапусками"""
+import os
+import struct
+import zlib
+import logging
+from typing import NamedTuple, Optional
+
+from i18n import translator
+
+# Формат файла: сигнатура, версия, пауза, интервал (мин), курсор сообщений,
+# срок следующего срабатывания, оставшиеся секунды (для паузы), время последнего
+# срабатывания (unix time, 0 - не было), затем CRC32 всего предыдущего
+_MAGIC = b'EYEC'
+_VERSION = 1
+_BODY = struct.Struct('<4sBBIQddd')
+_CRC = struct.Struct('<I')
+STATE_SIZE = _BODY.size + _CRC.size
+
+_log = translator('state')
+
+class TimerState(NamedTuple):
+    """Снимок состояния таймера"""
+    paused: bool
+    interval_minutes: int
+    idx: int
+    deadline: float  # unix time следующего срабатывания
+    seconds_left: float  # остаток на момент сохранения (используется при паузе)
+    last_fire: float  # unix time последнего автоматического срабатывания, 0 - не было
+
+class StateStore:
+    """
+    Файл состояния фиксированного размера (STATE_SIZE байт)
+
+    Пишется только при смене состояния (срабатывание, пауза, смена интервала,
+    выход) через временный файл и os.replace, поэтому прерванная запись не
+    портит предыдущий снимок. Одинаковые снимки повторно не записываются.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._last_written = None
+
+    def load(self) -> Optional[TimerState]:
+        """
+        Читает сохраненное состояние
+
+        Returns:
+            TimerState или None, если файла нет или он поврежден
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read(STATE_SIZE + 1)
+        except OSError:
+            return None
+        if len(data) != STATE_SIZE:
+            logging.warning(_log('state_invalid', path=self.path))
+            return None
+        body, (crc,) = data[:_BODY.size], _CRC.unpack(data[_BODY.size:])
+        magic, version, paused, interval, idx, deadline, seconds_left, last_fire = _BODY.unpack(body)
+        if magic != _MAGIC or version != _VERSION or zlib.crc32(body) != crc:
+            logging.warning(_log('state_invalid', path=self.path))
+            return None
+        self._last_written = data
+        return TimerState(bool(paused), interval, idx, deadline, seconds_left, last_fire)
+
+    def save(self, state: TimerState) -> None:
+        """Атомарно записывает состояние, если оно изменилось"""
+        body = _BODY.pack(_MAGIC, _VERSION, int(state.paused), state.interval_minutes, state.idx,
+                          state.deadline, state.seconds_left, state.last_fire)
+        data = body + _CRC.pack(zlib.crc32(body))
+        if data == self._last_written:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_written = data
+            logging.debug(_log('state_saved', seconds=int(state.seconds_left), paused=state.paused))
+        except OSError as e:
+            logging.error(_log('state_save_error', error=e))
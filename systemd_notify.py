@@ -0,0 +1,239 @@
+"""Уведомления systemd (протокол sd_notify через $NOTIFY_SOCKET, без libsystemd)"""
+import os
+import socket
+import tempfile
+import threading
+import time
+import logging
+from typing import Callable, List, Optional
+
+from i18n import translator
+
+STATUS_SECONDS = 10.0  # Как часто обновлять STATUS, если watchdog не требует чаще
+STOP_TIMEOUT = 2.0  # Сколько ждать поток heartbeat при остановке
+STALLED = -1  # Значение счетчика прогресса, означающее, что таймерный поток остановился
+
+_log = translator('systemd_notify')
+
+class SystemdNotifier:
+    """
+    Отправитель сообщений sd_notify
+
+    Сообщение - одна датаграмма "KEY=value" строками в AF_UNIX сокет из
+    $NOTIFY_SOCKET (адрес с '@' - абстрактное пространство имен Linux).
+    Если переменной нет (запуск не из systemd) или платформа без AF_UNIX,
+    все методы ничего не делают.
+
+    Watchdog: поток раз в половину WatchdogSec (и не реже STATUS_SECONDS)
+    сравнивает счетчик прогресса таймерного потока с прошлым значением и
+    шлет WATCHDOG=1 только если тот вырос. Зависший или упавший таймер
+    (например, взаимоблокировка на _lock) перестает продвигать счетчик, и
+    systemd перезапускает службу.
+    """
+
+    def __init__(self, address: Optional[str] = None, watchdog_interval: float = 0.0):
+        self.address = address
+        self.watchdog_interval = watchdog_interval
+        self._sock = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stalled = False
+        if address and hasattr(socket, 'AF_UNIX'):
+            if address.startswith('@'):
+                self.address = '\0' + address[1:]
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    @classmethod
+    def from_environment(cls) -> 'SystemdNotifier':
+        """
+        Создает отправитель по переменным окружения systemd
+
+        NOTIFY_SOCKET и WATCHDOG_* убираются из окружения, чтобы их не
+        унаследовали дочерние процессы (notify-send, osascript).
+        """
+        address = os.environ.pop('NOTIFY_SOCKET', None)
+        watchdog_usec = os.environ.pop('WATCHDOG_USEC', '')
+        watchdog_pid = os.environ.pop('WATCHDOG_PID', '')
+        interval = 0.0
+        if watchdog_usec.isdigit() and (not watchdog_pid or watchdog_pid == str(os.getpid())):
+            interval = int(watchdog_usec) / 1e6
+        notifier = cls(address, interval)
+        if notifier.enabled:
+            logging.info(_log('sd_enabled', watchdog=interval))
+        return notifier
+
+    @property
+    def enabled(self) -> bool:
+        """Проверяет, есть ли куда отправлять сообщения"""
+        return self._sock is not None
+
+    def send(self, *lines: str) -> bool:
+        """
+        Отправляет строки "KEY=value" одной датаграммой
+
+        Returns:
+            True, если датаграмма отправлена
+        """
+        if self._sock is None:
+            return False
+        try:
+            self._sock.sendto('\n'.join(lines).encode('utf-8'), self.address)
+            return True
+        except OSError as e:
+            logging.debug(_log('sd_send_error', error=e))
+            return False
+
+    def ready(self, status: str = '') -> bool:
+        """Сообщает о готовности службы (READY=1)"""
+        lines = ['READY=1', f'MAINPID={os.getpid()}']
+        if status:
+            lines.append('STATUS=' + status.replace('\n', ' '))
+        return self.send(*lines)
+
+    def status(self, text: str) -> bool:
+        """Обновляет строку состояния (видна в systemctl status)"""
+        return self.send('STATUS=' + text.replace('\n', ' '))
+
+    def stopping(self) -> bool:
+        """Сообщает о начале остановки (STOPPING=1)"""
+        return self.send('STOPPING=1')
+
+    def start_watchdog(self, progress: Callable[[], int], status: Callable[[], str]) -> None:
+        """
+        Запускает поток heartbeat/STATUS
+
+        Args:
+            progress: Счетчик, который растет, пока таймерный поток работает,
+                или STALLED, если поток завершился
+            status: Текущая строка состояния (например, обратный отсчет); не должна
+                брать блокировки таймерного потока
+        """
+        if self._sock is None or self._thread is not None:
+            return
+        period = STATUS_SECONDS
+        if self.watchdog_interval:
+            period = min(period, self.watchdog_interval / 2)
+        self._thread = threading.Thread(target=self._run, args=(progress, status, period), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает поток heartbeat и закрывает сокет"""
+        self._stop_event.set()
+        if self._thread is not None:
+            # Поток может висеть в status(); при остановке процесса ждать его бессмысленно
+            self._thread.join(STOP_TIMEOUT)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _run(self, progress: Callable[[], int], status: Callable[[], str], period: float) -> None:
+        last = progress()
+        missed = 0
+        while not self._stop_event.wait(period):
+            current = progress()
+            if current != last and current != STALLED:
+                last = current
+                missed = 0
+                if self._stalled:
+                    self._stalled = False
+                    logging.info(_log('sd_progress_resumed'))
+                lines = ['STATUS=' + status().replace('\n', ' ')]
+                if self.watchdog_interval:
+                    lines.append('WATCHDOG=1')
+                self.send(*lines)
+                continue
+            # Heartbeat не шлем: пусть systemd решает по WatchdogSec. Об остановке
+            # сообщаем со второго пропуска - тик мог просто не успеть между проверками
+            missed = 2 if current == STALLED else missed + 1
+            if missed >= 2 and not self._stalled:
+                self._stalled = True
+                logging.warning(_log('sd_stalled', seconds=period * missed))
+                self.status(_log('status_stalled'))
+
+def run_selftest(watchdog_interval: float = 0.2) -> bool:
+    """
+    Проверка протокола на локальном датаграммном сокете вместо systemd
+
+    Проверяет READY/STATUS, что WATCHDOG=1 идет, пока счетчик прогресса
+    растет, прекращается, когда он замирает, возобновляется вместе с ним и
+    не отправляется, если таймерный поток завершился (STALLED).
+
+    Returns:
+        True, если все проверки прошли
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        print(_log('test_unsupported'))
+        return False
+    tmpdir = tempfile.mkdtemp(prefix='eyecare-sd-')
+    path = os.path.join(tmpdir, 'notify.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    server.bind(path)
+    server.settimeout(watchdog_interval)
+
+    def receive(duration: float) -> List[str]:
+        messages = []
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            try:
+                messages.append(server.recv(4096).decode('utf-8'))
+            except socket.timeout:
+                continue
+        return messages
+
+    ticks = [0]
+    running = [True]
+    dead = [False]
+
+    def advance():
+        while running[0]:
+            ticks[0] += 1
+            time.sleep(watchdog_interval / 10)
+
+    notifier = SystemdNotifier(path, watchdog_interval)
+    checks = []
+    try:
+        notifier.ready('starting')
+        first = receive(watchdog_interval)
+        checks.append(('ready', bool(first) and first[0].startswith('READY=1')))
+
+        ticker = threading.Thread(target=advance, daemon=True)
+        ticker.start()
+        notifier.start_watchdog(lambda: STALLED if dead[0] else ticks[0], lambda: f'tick {ticks[0]}')
+        alive = receive(watchdog_interval * 3)
+        checks.append(('watchdog', sum('WATCHDOG=1' in m for m in alive) >= 3))
+        checks.append(('status', any(m.startswith('STATUS=tick ') for m in alive)))
+
+        running[0] = False
+        ticker.join()
+        receive(watchdog_interval)  # сообщения, отправленные до остановки счетчика
+        stalled = receive(watchdog_interval * 3)
+        checks.append(('stall', not any('WATCHDOG=1' in m for m in stalled)))
+
+        running[0] = True
+        ticker = threading.Thread(target=advance, daemon=True)
+        ticker.start()
+        resumed = receive(watchdog_interval * 2)
+        checks.append(('resume', any('WATCHDOG=1' in m for m in resumed)))
+
+        # Поток "завершился": счетчик сменился на STALLED, но это не прогресс
+        dead[0] = True
+        receive(watchdog_interval)
+        finished = receive(watchdog_interval * 3)
+        checks.append(('dead_thread', not any('WATCHDOG=1' in m for m in finished)))
+        running[0] = False
+        ticker.join()
+
+        notifier.stopping()
+        checks.append(('stopping', 'STOPPING=1' in receive(watchdog_interval)))
+    finally:
+        notifier.stop()
+        server.close()
+        os.unlink(path)
+        os.rmdir(tmpdir)
+
+    for name, ok in checks:
+        print(_log('test_check_ok' if ok else 'test_check_failed', check=name))
+    passed = all(ok for _, ok in checks)
+    print(_log('test_passed' if passed else 'test_failed'))
+    return passed
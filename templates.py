@@ -0,0 +1,144 @@
+"""Шаблоны сообщений с подстановками из провайдеров контекста"""
+import datetime
+import string
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# Провайдеры контекста: имя подстановки -> функция(app) -> значение.
+# app - объект приложения (TrayManager) или None; провайдеры читают его
+# атрибуты через getattr, чтобы работать и без трея (например, в демоне).
+PROVIDERS: Dict[str, Callable[[Any], Any]] = {}
+
+_formatter = string.Formatter()
+
+class TemplateError(ValueError):
+    """Ошибка разбора шаблона сообщения"""
+
+def register_provider(name: str, func: Optional[Callable[[Any], Any]] = None):
+    """
+    Регистрирует провайдер контекста для подстановки {name}
+
+    Можно использовать как декоратор: @register_provider('name').
+    Провайдеры нужно регистрировать до load_config(), иначе шаблоны
+    с новой подстановкой будут отклонены.
+    """
+    if func is None:
+        def decorator(f):
+            PROVIDERS[name] = f
+            return f
+        return decorator
+    PROVIDERS[name] = func
+    return func
+
+class FireContext:
+    """Контекст одного срабатывания: провайдеры вычисляются лениво и не более одного раза"""
+
+    __slots__ = ('app', '_cache')
+
+    def __init__(self, app=None):
+        self.app = app
+        self._cache = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = PROVIDERS[name](self.app)
+            return value
+
+class Template(str):
+    """
+    Скомпилированный шаблон сообщения
+
+    Является строкой с исходным текстом, поэтому может использоваться везде,
+    где раньше были обычные сообщения. Разбор выполняется один раз в конструкторе.
+    """
+
+    def __new__(cls, text: str):
+        obj = super().__new__(cls, text)
+        obj.parts, obj.fields = _compile(text)
+        return obj
+
+    def render(self, ctx: FireContext) -> str:
+        """Подставляет значения провайдеров, на которые ссылается шаблон"""
+        if not self.fields:
+            return str(self)
+        out = []
+        for literal, field, conversion, spec in self.parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = ctx[field]
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            out.append(format(value, spec))
+        return ''.join(out)
+
+def _compile(text: str) -> Tuple[List[Tuple[str, Optional[str], Optional[str], str]], FrozenSet[str]]:
+    try:
+        parsed = list(_formatter.parse(text))
+    except ValueError as e:
+        raise TemplateError(f'"{text}": {e}') from None
+
+    parts = []
+    fields = set()
+    for literal, field, spec, conversion in parsed:
+        if field is None:
+            parts.append((literal, None, None, ''))
+            continue
+        if not field:
+            raise TemplateError(f'"{text}": empty placeholder {{}}')
+        if field not in PROVIDERS:
+            raise TemplateError(f'"{text}": unknown placeholder {{{field}}}, '
+                                f'available: {", ".join(sorted(PROVIDERS))}')
+        if conversion not in (None, 'r', 's', 'a'):
+            raise TemplateError(f'"{text}": invalid conversion !{conversion}')
+        if spec and '{' in spec:
+            raise TemplateError(f'"{text}": nested placeholders are not supported')
+        if spec:
+            _check_spec(text, field, conversion, spec)
+        parts.append((literal, field, conversion, spec or ''))
+        fields.add(field)
+    return parts, frozenset(fields)
+
+def _check_spec(text: str, field: str, conversion: Optional[str], spec: str) -> None:
+    """Проверяет спецификацию формата на примерном значении провайдера (без приложения)"""
+    try:
+        sample = PROVIDERS[field](None)
+    except Exception:
+        return  # Провайдеру нужно приложение: проверить заранее нельзя
+    try:
+        if conversion:
+            sample = _formatter.convert_field(sample, conversion)
+        format(sample, spec)
+    except (ValueError, TypeError) as e:
+        raise TemplateError(f'"{text}": invalid format spec {{{field}:{spec}}}: {e}') from None
+
+def render(msg: str, ctx: FireContext) -> str:
+    """Возвращает текст сообщения; обычные строки возвращаются как есть"""
+    if isinstance(msg, Template):
+        try:
+            return msg.render(ctx)
+        except Exception:
+            # Ошибка провайдера или формата не должна терять напоминание
+            return str(msg)
+    return msg
+
+@register_provider('time')
+def _provide_time(app) -> str:
+    return time.strftime('%H:%M')
+
+@register_provider('interval')
+def _provide_interval(app) -> int:
+    return getattr(app, 'interval_minutes', None) or 0
+
+@register_provider('work_minutes')
+def _provide_work_minutes(app) -> int:
+    since = getattr(app, 'last_fire', None) or time.time()
+    return int(max(0, time.time() - since) // 60)
+
+@register_provider('breaks_today')
+def _provide_breaks_today(app) -> int:
+    if getattr(app, 'breaks_day', None) != datetime.date.today():
+        return 0
+    return getattr(app, 'breaks_today', 0)
@@ -0,0 +1,239 @@
+"""Рабочие и тихие часы: расписание, скомпилированное в недельную битовую карту"""
+import datetime
+import re
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 1440
+NO_ACTIVE = 0xFFFF  # В таблице "до следующей активной минуты": в этот день активных минут больше нет
+TZ_RECHECK_SECONDS = 60  # Как часто перечитывать системный часовой пояс (time.tzset)
+
+_DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+_RULE_RE = re.compile(r'^(?:(?P<days>[a-z,\-]+)\s+)?(?P<start>\d{1,2}:\d{2})\s*-\s*(?P<end>\d{1,2}:\d{2})$')
+
+class ScheduleError(ValueError):
+    """Ошибка разбора секции [Schedule]"""
+
+def _parse_minute(value: str) -> int:
+    hours, minutes = (int(part) for part in value.split(':'))
+    if hours == 24 and minutes == 0:
+        return MINUTES_PER_DAY
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ScheduleError(f'invalid time "{value}"')
+    return hours * 60 + minutes
+
+def _parse_days(value: Optional[str]) -> List[int]:
+    if not value:
+        return list(range(7))
+    days = set()
+    for part in value.split(','):
+        first, _, last = part.partition('-')
+        if first not in _DAYS or (last and last not in _DAYS):
+            raise ScheduleError(f'invalid day "{part}", expected {"/".join(_DAYS)}')
+        i, j = _DAYS.index(first), _DAYS.index(last or first)
+        while True:
+            days.add(i)
+            if i == j:
+                break
+            i = (i + 1) % 7
+    return sorted(days)
+
+def _parse_rules(value: str, allow_days: bool = True) -> List[Tuple[List[int], int, int]]:
+    """Разбирает правила вида "mon-fri 09:00-18:00; 22:00-07:00" (дни необязательны, а при allow_days=False запрещены)"""
+    rules = []
+    for raw in value.split(';'):
+        rule = raw.strip().lower()
+        if not rule:
+            continue
+        m = _RULE_RE.match(rule)
+        if not m:
+            raise ScheduleError(f'invalid rule "{raw.strip()}", expected "[days] HH:MM-HH:MM"')
+        if m.group('days') and not allow_days:
+            raise ScheduleError(f'invalid rule "{raw.strip()}", days of week are not allowed here, expected "HH:MM-HH:MM"')
+        rules.append((_parse_days(m.group('days')), _parse_minute(m.group('start')), _parse_minute(m.group('end'))))
+    return rules
+
+def _apply(week: bytearray, rules: Iterable[Tuple[List[int], int, int]], value: int) -> None:
+    """Проставляет value в минутах правил; интервал через полночь переходит на следующий день"""
+    size = len(week)
+    for days, start, end in rules:
+        length = (end - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        for day in days:
+            base = day * MINUTES_PER_DAY + start
+            for offset in range(length):
+                week[(base + offset) % size] = value
+
+def _rules_day(rules: Iterable[Tuple[List[int], int, int]], weekday: int,
+               own: bool = True, carried: bool = True) -> bytearray:
+    """
+    Минуты одного дня недели, покрытые правилами
+
+    Args:
+        rules: Разобранные правила
+        weekday: День недели (0 - понедельник)
+        own: Учитывать интервалы, начинающиеся в этот день
+        carried: Учитывать хвосты интервалов через полночь, начатых накануне
+    """
+    day = bytearray(MINUTES_PER_DAY)
+    for days, start, end in rules:
+        wraps = end <= start
+        if own and weekday in days:
+            for minute in range(start, MINUTES_PER_DAY if wraps else end):
+                day[minute] = 1
+        if carried and wraps and (weekday - 1) % 7 in days:
+            for minute in range(0, min(end, MINUTES_PER_DAY)):
+                day[minute] = 1
+    return day
+
+def _next_table(day: bytearray) -> array:
+    """Для каждой минуты дня - сколько минут до ближайшей активной в тот же день"""
+    table = array('H', [NO_ACTIVE]) * MINUTES_PER_DAY
+    distance = NO_ACTIVE
+    for minute in range(MINUTES_PER_DAY - 1, -1, -1):
+        if day[minute]:
+            distance = 0
+        elif distance != NO_ACTIVE:
+            distance += 1
+        table[minute] = distance
+    return table
+
+class WeeklySchedule:
+    """
+    Скомпилированное расписание активности
+
+    Рабочие часы минус тихие часы сворачиваются при загрузке в карту на
+    7 * 1440 минут и таблицы "до следующей активной минуты" для каждого дня.
+    Исключения по датам хранятся отдельными дневными картами. is_active() -
+    это один localtime() и обращение по индексу; next_active() перескакивает
+    по дням, не перебирая минуты. Локальное время берется заново при каждом
+    вызове, поэтому переходы на летнее время и смена часового пояса
+    учитываются автоматически (системный пояс перечитывается раз в минуту).
+    """
+
+    def __init__(self, week: bytearray, exceptions: Dict[datetime.date, bytearray]):
+        self._tz_checked = 0.0
+        self._days = [week[d * MINUTES_PER_DAY:(d + 1) * MINUTES_PER_DAY] for d in range(7)]
+        self._tables = [_next_table(day) for day in self._days]
+        self._exceptions = {date: (day, _next_table(day)) for date, day in exceptions.items()}
+
+    def _day(self, date: datetime.date) -> Tuple[bytearray, array]:
+        exception = self._exceptions.get(date)
+        if exception is not None:
+            return exception
+        weekday = date.weekday()
+        return self._days[weekday], self._tables[weekday]
+
+    def _refresh_timezone(self) -> None:
+        # Подхватываем смену системного часового пояса без перезапуска (только Unix)
+        now = time.monotonic()
+        if hasattr(time, 'tzset') and now - self._tz_checked >= TZ_RECHECK_SECONDS:
+            self._tz_checked = now
+            time.tzset()
+
+    def is_active(self, now: Optional[float] = None) -> bool:
+        """Проверяет, разрешены ли напоминания в момент now (unix time)"""
+        self._refresh_timezone()
+        lt = time.localtime(now)
+        day, _ = self._day(datetime.date(lt.tm_year, lt.tm_mon, lt.tm_mday))
+        return bool(day[lt.tm_hour * 60 + lt.tm_min])
+
+    def next_active(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Возвращает момент (unix time) начала ближайшей активной минуты
+
+        Returns:
+            now, если сейчас активно; None, если активных минут нет вовсе
+        """
+        now = time.time() if now is None else now
+        self._refresh_timezone()
+        lt = time.localtime(now)
+        date = datetime.date(lt.tm_year, lt.tm_mon, lt.tm_mday)
+        minute = lt.tm_hour * 60 + lt.tm_min
+        # Неделя плюс горизонт исключений: дальше расписание повторяется
+        horizon = max([8] + [(d - date).days + 8 for d in self._exceptions])
+        for hop in range(horizon):
+            _, table = self._day(date)
+            distance = table[minute]
+            if hop == 0 and distance == 0:
+                return now
+            if distance != NO_ACTIVE:
+                target = minute + distance
+                wall = datetime.datetime(date.year, date.month, date.day, target // 60, target % 60)
+                # mktime с tm_isdst=-1 сам разрешает переходы на летнее/зимнее время
+                return max(now, time.mktime(wall.timetuple()))
+            date += datetime.timedelta(days=1)
+            minute = 0
+        return None
+
+def compile_schedule(working_hours: str = '', quiet_hours: str = '', exceptions: str = '') -> Optional[WeeklySchedule]:
+    """
+    Компилирует правила секции [Schedule]
+
+    Args:
+        working_hours: "mon-fri 09:00-18:00; sat 10:00-14:00" (пусто - круглосуточно)
+        quiet_hours: "22:00-07:00; mon-fri 12:30-13:30" (вычитаются из рабочих часов)
+        exceptions: "2026-12-31 off; 2026-12-24 10:00-14:00" (заменяют рабочие часы в эти даты;
+            хвост ночного рабочего интервала предыдущего дня сохраняется)
+
+    Returns:
+        WeeklySchedule или None, если правила не ограничивают активность
+
+    Raises:
+        ScheduleError: при синтаксической ошибке или если активных минут не остается
+    """
+    if not (working_hours.strip() or quiet_hours.strip() or exceptions.strip()):
+        return None
+
+    working = _parse_rules(working_hours)
+    quiet = _parse_rules(quiet_hours)
+    week = bytearray(b'\x01' * 7 * MINUTES_PER_DAY) if not working else bytearray(7 * MINUTES_PER_DAY)
+    _apply(week, working, 1)
+    _apply(week, quiet, 0)
+
+    parsed = {}
+    for raw in exceptions.split(';'):
+        rule = raw.strip().lower()
+        if not rule:
+            continue
+        date_str, _, ranges = rule.partition(' ')
+        try:
+            date = datetime.date.fromisoformat(date_str)
+        except ValueError:
+            raise ScheduleError(f'invalid exception date "{date_str}", expected YYYY-MM-DD') from None
+        # Исключение относится к одной дате: дни недели в нем бессмысленны
+        parsed[date] = [] if ranges.strip() == 'off' else _parse_rules(ranges, allow_days=False)
+
+    def quiet_minutes(weekday: int) -> bytearray:
+        # Тихие часы действуют и в исключения, включая хвост ночного интервала предыдущего дня
+        return _rules_day(quiet, weekday)
+
+    dates = {}
+    for date, ranges in parsed.items():
+        weekday = date.weekday()
+        day = bytearray(MINUTES_PER_DAY)
+        # В исключении интервалы ограничены этой датой и не переходят через полночь
+        for _, start, end in ranges:
+            for minute in range(start, end if end > start else MINUTES_PER_DAY):
+                day[minute] = 1
+        # Хвост рабочего интервала через полночь, начатого накануне по обычному расписанию
+        if working and date - datetime.timedelta(days=1) not in parsed:
+            carried = _rules_day(working, weekday, own=False)
+            for minute in range(MINUTES_PER_DAY):
+                day[minute] |= carried[minute]
+        silent = quiet_minutes(weekday)
+        dates[date] = bytearray(0 if silent[minute] else day[minute] for minute in range(MINUTES_PER_DAY))
+
+    # Наоборот, день после исключения не получает хвост рабочего интервала, который исключение заменило
+    for date in parsed:
+        following = date + datetime.timedelta(days=1)
+        weekday = following.weekday()
+        if not working or following in parsed or not any(_rules_day(working, weekday, own=False)):
+            continue
+        own = _rules_day(working, weekday, carried=False)
+        silent = quiet_minutes(weekday)
+        dates[following] = bytearray(0 if silent[minute] else own[minute] for minute in range(MINUTES_PER_DAY))
+
+    if not any(week) and not any(any(day) for day in dates.values()):
+        raise ScheduleError('schedule leaves no active minutes')
+    return WeeklySchedule(week, dates)